@@ -1,162 +1,253 @@
-import json
-import os
 import time
-from typing import Dict, Any, List, Set
-from pathlib import Path
+from collections import Counter, OrderedDict
+from typing import Dict, Any, List, Optional, Set, Tuple
 import logging
 
+from app.cache_store import CacheStore
+from app.firebase_client import article_sort_key
+from app.frequency import FrequencyCounter
+from app.views import VIEWS, summarize_article, encode_cursor
+from app.responses import PRESERIALIZED_LIMITS, PreparedBody, articles_envelope, encode_json
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Which countries the cache admits:
+# - "whitelist": only whitelisted countries, never evicted
+# - "lru": any country; beyond max_bytes the least recently used non-whitelisted ones are evicted
+# - "tinylfu": like "lru", but a new country is only admitted if it is requested more
+#   often than the countries it would evict
+CACHE_POLICIES = ("whitelist", "lru", "tinylfu")
+
 
 
 class ArticleCache:
-    def __init__(self, cache_file_path: str = "article_cache.json"):
+    def __init__(self, store: CacheStore, read_through: bool = True, negative_ttl: float = 300,
+                 default_depth: int = 10, policy: str = "whitelist",
+                 max_bytes: int = 0, auto_whitelist_size: int = 0, auto_whitelist_min_requests: float = 5,
+                 auto_whitelist_interval: float = 60):
         """
         Initialize the article cache
         
         Args:
-            cache_file_path: Path to the cache file
+            store: Persistence backend the cache is loaded from and saved to
+            read_through: Whether Firebase results fetched on a cache miss populate the cache
+            negative_ttl: Seconds a country with no articles is remembered as empty
+            default_depth: Number of articles cached for countries without their own depth
+            policy: Admission/eviction policy, one of CACHE_POLICIES
+            max_bytes: Memory budget for cached countries (articles plus prepared
+                bodies), 0 for unbounded; whitelisted countries are never evicted
+            auto_whitelist_size: Number of most requested countries whitelisted
+                automatically on top of the manual (pinned) whitelist, 0 to disable
+            auto_whitelist_min_requests: Decayed request count a country needs to be
+                whitelisted automatically
+            auto_whitelist_interval: Seconds between updates of the automatic whitelist
         """
-        logger.info(f"Initializing ArticleCache with cache file: {cache_file_path}")
-        self.cache_file_path = cache_file_path
+        logger.info(f"Initializing ArticleCache with {type(store).__name__}")
+        self.store = store
+        self.policy = policy
+        self.max_bytes = max_bytes
+        self.auto_whitelist_size = auto_whitelist_size
+        self.auto_whitelist_min_requests = auto_whitelist_min_requests
+        self.auto_whitelist_interval = auto_whitelist_interval
+        self.next_auto_whitelist_update = 0.0
+        self.read_through = read_through
+        self.negative_ttl = negative_ttl
+        self.default_depth = default_depth
         self.cache: Dict[str, Any] = {}
+        # Pre-truncated summary view of each cached country, kept in step with self.cache
+        self.summaries: Dict[str, List[Dict[str, Any]]] = {}
+        # Serialized response bodies per country and (view, limit), compressed on first use
+        self.bodies: Dict[str, Dict[Tuple[str, int], PreparedBody]] = {}
         self.last_refresh_time: Dict[str, float] = {}
+        # articleVersion/{country} stamp each cached country was loaded at
+        self.article_versions: Dict[str, Any] = {}
+        # Manually whitelisted (pinned) countries, and those whitelisted for their popularity
         self.whitelisted_countries: Set[str] = set()
+        self.auto_whitelisted_countries: Set[str] = set()
+        # Per-country number of articles to cache, overriding default_depth
+        self.cache_depths: Dict[str, int] = {}
+        # Countries known to have no articles, mapped to when that entry expires (memory only)
+        self.negative_cache: Dict[str, float] = {}
+        # Countries and settings changed since the last save
+        self.dirty_countries: Set[str] = set()
+        self.settings_dirty = False
+        # Cached countries, least recently used first, and the serialized size of their articles
+        # (prepared bodies are counted separately, as their compressed variants are built on demand)
+        self.recency: "OrderedDict[str, None]" = OrderedDict()
+        self.article_bytes: Dict[str, int] = {}
+        # Decaying per-country request counts, used for TinyLFU admission
+        self.frequency = FrequencyCounter()
+        # Per-country hit, miss, eviction and rejected-admission counts
+        self.stats: Dict[str, Counter] = {name: Counter() for name in ("hits", "misses", "evictions", "rejections")}
         
         # Load cache from file if it exists
         self._load_cache()
+        self._make_room()
         logger.info(f"ArticleCache initialized with {len(self.cache)} countries in cache and {len(self.whitelisted_countries)} whitelisted countries")
     
     def _load_cache(self) -> None:
-        """Load the cache from the cache file"""
-        logger.info(f"Attempting to load cache from {self.cache_file_path}")
+        """Load the cache from the persistence store"""
+        logger.info(f"Attempting to load cache from {type(self.store).__name__}")
         try:
-            if os.path.exists(self.cache_file_path):
-                logger.info(f"Cache file exists, loading data")
-                with open(self.cache_file_path, 'r') as f:
-                    cache_data = json.load(f)
-                    
-                    # Extract cache and metadata
-                    self.cache = cache_data.get("articles", {})
-                    self.last_refresh_time = cache_data.get("last_refresh_time", {})
-                    self.whitelisted_countries = set(cache_data.get("whitelisted_countries", []))
-                    
-                    # Log detailed information about the loaded cache
-                    cached_countries = list(self.cache.keys())
-                    whitelisted_countries = list(self.whitelisted_countries)
-                    article_counts = {country: len(articles) for country, articles in self.cache.items()}
-                    total_articles = sum(len(articles) for articles in self.cache.values())
-                    
-                    logger.info(f"Cache loaded from {self.cache_file_path}")
-                    logger.info(f"Cached countries ({len(cached_countries)}): {cached_countries}")
-                    logger.info(f"Whitelisted countries ({len(whitelisted_countries)}): {whitelisted_countries}")
-                    logger.info(f"Total articles in cache: {total_articles}")
-                    logger.info(f"Articles per country: {article_counts}")
-                    
-                    # Log refresh times in human-readable format
-                    if self.last_refresh_time:
-                        refresh_times = {country: time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp)) 
-                                        for country, timestamp in self.last_refresh_time.items()}
-                        logger.info(f"Last refresh times: {refresh_times}")
-            else:
-                logger.info(f"Cache file does not exist at {self.cache_file_path}, initializing empty cache")
+            cache_data = self.store.load()
+            
+            # Extract metadata first: the prepared bodies depend on each country's depth
+            self.last_refresh_time = cache_data.get("last_refresh_time", {})
+            self.article_versions = cache_data.get("article_versions", {})
+            self.whitelisted_countries = set(cache_data.get("whitelisted_countries", []))
+            self.auto_whitelisted_countries = set(cache_data.get("auto_whitelisted_countries", []))
+            self.cache_depths = cache_data.get("cache_depths", {})
+            self.cache = cache_data.get("articles", {})
+            for country in self.cache:
+                self._build_views(country)
+            
+            # Log detailed information about the loaded cache
+            cached_countries = list(self.cache.keys())
+            whitelisted_countries = list(self.whitelisted_countries)
+            article_counts = {country: len(articles) for country, articles in self.cache.items()}
+            total_articles = sum(len(articles) for articles in self.cache.values())
+            
+            logger.info(f"Cached countries ({len(cached_countries)}): {cached_countries}")
+            logger.info(f"Whitelisted countries ({len(whitelisted_countries)}): {whitelisted_countries}")
+            logger.info(f"Total articles in cache: {total_articles}")
+            logger.info(f"Articles per country: {article_counts}")
+            
+            # Log refresh times in human-readable format
+            if self.last_refresh_time:
+                refresh_times = {country: time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp)) 
+                                for country, timestamp in self.last_refresh_time.items()}
+                logger.info(f"Last refresh times: {refresh_times}")
         except Exception as e:
             logger.error(f"Error loading cache: {e}")
             # Initialize empty cache if loading fails
             self.cache = {}
+            self.summaries = {}
+            self.bodies = {}
             self.last_refresh_time = {}
+            self.article_versions = {}
             logger.warning("Initialized empty cache due to loading error")
-    
+            
     def _save_cache(self) -> None:
-        """Save the cache to the cache file"""
-        logger.info(f"Attempting to save cache to {self.cache_file_path}")
+        """Persist the countries and settings changed since the last save"""
+        if not self.dirty_countries and not self.settings_dirty:
+            return
+        logger.info(f"Saving cache: {len(self.dirty_countries)} changed countries, settings changed: {self.settings_dirty}")
         try:
-            # Create directory if it doesn't exist
-            cache_dir = os.path.dirname(self.cache_file_path)
-            if cache_dir and not os.path.exists(cache_dir):
-                logger.info(f"Creating cache directory: {cache_dir}")
-                os.makedirs(cache_dir)
-                
-            # Save cache with metadata
             cache_data = {
                 "articles": self.cache,
                 "last_refresh_time": self.last_refresh_time,
-                "whitelisted_countries": list(self.whitelisted_countries)
+                "article_versions": self.article_versions,
+                "whitelisted_countries": list(self.whitelisted_countries),
+                "auto_whitelisted_countries": list(self.auto_whitelisted_countries),
+                "cache_depths": self.cache_depths
             }
-            
-            # Log detailed information about what's being saved
-            cached_countries = list(self.cache.keys())
-            whitelisted_countries = list(self.whitelisted_countries)
-            total_articles = sum(len(articles) for articles in self.cache.values())
-            
-            logger.info(f"Saving cache with {len(cached_countries)} countries and {total_articles} total articles")
-            logger.info(f"Cached countries: {cached_countries}")
-            logger.info(f"Whitelisted countries: {whitelisted_countries}")
-            
-            # Calculate approximate size of the cache data
-            cache_size = len(json.dumps(cache_data))
-            cache_size_kb = cache_size / 1024
-            logger.info(f"Cache data size: approximately {cache_size_kb:.2f} KB")
-            
-            with open(self.cache_file_path, 'w') as f:
-                json.dump(cache_data, f, indent=2)
-                
-            logger.info(f"Cache successfully saved to {self.cache_file_path}")
+            self.store.save(cache_data, self.dirty_countries, self.settings_dirty)
+            self.dirty_countries = set()
+            self.settings_dirty = False
         except Exception as e:
+            # Changes stay marked dirty and are retried on the next save
             logger.error(f"Error saving cache: {e}")
     
-    def get_articles(self, country: str) -> List[Dict[str, Any]]:
+    def get_articles(self, country: str, limit: Optional[int] = None, view: str = "full") -> List[Dict[str, Any]]:
         """
         Get articles for a country from the cache
         
         Args:
             country: Country code
+            limit: Number of articles the caller needs; the cache only answers if it
+                holds that many or holds everything the country has
+            view: "full" for the cached articles, "summary" for their pre-truncated summaries
             
         Returns:
             List of articles or None if not in cache
         """
         country = country.upper()
-        logger.info(f"Attempting to get articles for country {country} from cache")
+        logger.debug("Attempting to get articles for country %s from cache", country)
+        
+        if self.is_negative_cached(country):
+            logger.info("Negative cache HIT for country %s: no articles", country)
+            self.stats["hits"][country] += 1
+            return []
         
         articles = self.cache.get(country, None)
         
+        # Fewer cached articles than the depth means the country has no more to fetch
+        if articles is not None and limit is not None and limit > len(articles) \
+                and len(articles) >= self.get_cache_depth(country):
+            logger.info("Cache MISS for country %s: %s articles requested, %d cached", country, limit, len(articles))
+            self.stats["misses"][country] += 1
+            return None
+        
         if articles is not None:
-            logger.info(f"Cache HIT for country {country}: found {len(articles)} articles")
+            logger.info("Cache HIT for country %s: found %d articles", country, len(articles))
+            self.stats["hits"][country] += 1
+            self.recency.move_to_end(country)
             
-            # Log the date range if articles exist
+            # Cached lists are kept sorted newest first, so the date range needs no sort
             if articles:
-                # Sort by date for logging purposes
-                sorted_articles = sorted(articles, 
-                                         key=lambda x: int(x.get("metadata", {}).get("datePublishedUnix", 0) or 0), 
-                                         reverse=True)
-                newest_date = sorted_articles[0].get("date", "unknown")
-                oldest_date = sorted_articles[-1].get("date", "unknown") if len(sorted_articles) > 1 else newest_date
-                logger.info(f"Date range for {country}: {newest_date} to {oldest_date}")
+                logger.debug("Date range for %s: %s to %s", country,
+                             articles[0].get("date", "unknown"), articles[-1].get("date", "unknown"))
+            
+            if view == "summary":
+                articles = self.summaries[country]
         else:
-            logger.info(f"Cache MISS for country {country}")
+            logger.info("Cache MISS for country %s", country)
+            self.stats["misses"][country] += 1
             
         return articles
     
-    def set_articles(self, country: str, articles: List[Dict[str, Any]]) -> None:
+    def set_articles(self, country: str, articles: List[Dict[str, Any]], version: Any = None) -> None:
         """
         Set articles for a country in the cache
         
         Args:
             country: Country code
             articles: List of articles
+            version: The country's articleVersion stamp, read before the articles were fetched
+        """
+        if self._apply_articles(country, articles, version):
+            # Save the cache to disk
+            self._save_cache()
+    
+    def set_many_articles(self, articles_by_country: Dict[str, List[Dict[str, Any]]],
+                          versions: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Set articles for several countries and save the cache once
+        
+        Args:
+            articles_by_country: Map of country code to its list of articles
+            versions: Map of country code to its articleVersion stamp
+        """
+        logger.info(f"Attempting to set articles for {len(articles_by_country)} countries in cache")
+        versions = versions or {}
+        updated = [country for country, articles in articles_by_country.items()
+                   if self._apply_articles(country, articles, versions.get(country))]
+        if updated:
+            logger.info(f"Saving cache once for {len(updated)} updated countries")
+            self._save_cache()
+    
+    def _apply_articles(self, country: str, articles: List[Dict[str, Any]], version: Any = None) -> bool:
+        """
+        Update a country's cached articles in memory, without saving
+        
+        Args:
+            country: Country code
+            articles: List of articles
+            version: The country's articleVersion stamp, None if unknown
+            
+        Returns:
+            True if the country was admitted and updated
         """
         country = country.upper()
         logger.info(f"Attempting to set articles for country {country} in cache")
         
-        if country in self.whitelisted_countries:
+        if self.can_cache(country):
             # Sort articles by date (newest first)
-            sorted_articles = sorted(articles, 
-                                     key=lambda x: int(x.get("metadata", {}).get("datePublishedUnix", 0) or 0), 
-                                     reverse=True)
+            sorted_articles = sorted(articles, key=article_sort_key, reverse=True)
             
-            # Use all articles passed from main.py (which are already limited)
-            articles_to_cache = sorted_articles
+            # Keep only as many articles as this country's cache depth
+            articles_to_cache = sorted_articles[:self.get_cache_depth(country)]
             
             # Log information about the articles being cached
             if articles_to_cache:
@@ -166,18 +257,365 @@ class ArticleCache:
             else:
                 logger.warning(f"No articles to cache for country {country}")
             
-            # Update the cache
+            # Update the cache, then make room for it within the memory budget
+            was_cached = country in self.cache
             self.cache[country] = articles_to_cache
+            self._build_views(country)
+            self.recency[country] = None
+            self.recency.move_to_end(country)
+            if not self._make_room(country, was_cached):
+                return was_cached
             self.last_refresh_time[country] = time.time()
+            self.negative_cache.pop(country, None)
+            self.dirty_countries.add(country)
+            if version is not None:
+                self.article_versions[country] = version
+            else:
+                # Without a known version the next refresh must refetch
+                self.article_versions.pop(country, None)
             
             # Log the update time in human-readable format
             refresh_time_str = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.last_refresh_time[country]))
             logger.info(f"Cache updated for country {country} at {refresh_time_str} with {len(articles_to_cache)} articles")
-            
-            # Save the cache to disk
-            self._save_cache()
+            return True
         else:
             logger.warning(f"Country {country} is not whitelisted, skipping cache update")
+            return False
+    
+    def can_cache(self, country: str) -> bool:
+        """
+        Check if the cache policy lets a country be cached at all
+        
+        Args:
+            country: Country code
+            
+        Returns:
+            True for whitelisted countries, and for any country unless the policy is "whitelist"
+        """
+        return self.policy != "whitelist" or self._is_whitelisted(country.upper())
+    
+    def _is_whitelisted(self, country: str) -> bool:
+        """Check if an uppercase country is pinned or automatically whitelisted"""
+        return country in self.whitelisted_countries or country in self.auto_whitelisted_countries
+    
+    def _make_room(self, candidate: Optional[str] = None, was_cached: bool = True) -> bool:
+        """
+        Evict least recently used countries until the cache fits its memory budget
+        
+        Whitelisted countries are never evicted. With the "tinylfu" policy a newly
+        cached candidate is rejected instead if any country it would evict has been
+        requested at least as often.
+        
+        Args:
+            candidate: Country just stored, which is not evicted to make room for itself
+            was_cached: Whether the candidate was already cached before this update
+            
+        Returns:
+            False if the candidate itself was dropped
+        """
+        excess = self.get_total_bytes() - self.max_bytes
+        if self.max_bytes <= 0 or excess <= 0:
+            return True
+        
+        victims = []
+        freed = 0
+        for country in self.recency:
+            if freed >= excess:
+                break
+            if country == candidate or self._is_whitelisted(country):
+                continue
+            victims.append(country)
+            freed += self.get_entry_bytes(country)
+        
+        candidate_pinned = candidate is None or self._is_whitelisted(candidate)
+        if not candidate_pinned:
+            rejected = freed < excess
+            if not rejected and self.policy == "tinylfu" and not was_cached:
+                candidate_frequency = self.frequency.estimate(candidate)
+                rejected = any(self.frequency.estimate(victim) >= candidate_frequency for victim in victims)
+            if rejected:
+                logger.info(f"Not caching {candidate}: it doesn't fit the {self.max_bytes} byte budget "
+                            f"ahead of {victims}")
+                self._evict(candidate, "evictions" if was_cached else "rejections")
+                return False
+        elif freed < excess:
+            logger.warning(f"Whitelisted countries alone exceed the {self.max_bytes} byte cache budget")
+        
+        for victim in victims:
+            self._evict(victim)
+        return True
+    
+    def _evict(self, country: str, counter: str = "evictions") -> None:
+        """Remove a country from the cache to free memory, counting it under `counter`"""
+        logger.info(f"Evicting {country} ({self.get_entry_bytes(country)} bytes) from cache")
+        self.cache.pop(country, None)
+        self.last_refresh_time.pop(country, None)
+        self.article_versions.pop(country, None)
+        self._drop_views(country)
+        self.dirty_countries.add(country)
+        self.stats[counter][country] += 1
+    
+    def _build_views(self, country: str) -> None:
+        """
+        Rebuild the derived representations of a cached country
+        
+        Builds the summary list and, for every view and every preserialized limit
+        up to the country's depth, the serialized response body (its compressed
+        variants are built the first time each is sent).
+        """
+        articles = self.cache[country]
+        self.summaries[country] = [summarize_article(article) for article in articles]
+        
+        by_view = {"full": articles, "summary": self.summaries[country]}
+        depth = self.get_cache_depth(country)
+        bodies = {}
+        for view in VIEWS:
+            for limit in PRESERIALIZED_LIMITS:
+                if limit > depth:
+                    break
+                page = by_view[view][:limit]
+                next_cursor = encode_cursor(page[-1]) if self.has_more_after(country, limit) else None
+                envelope = articles_envelope(country, page, limit, view, "cache", next_cursor)
+                bodies[(view, limit)] = PreparedBody(envelope)
+        self.bodies[country] = bodies
+        self.article_bytes[country] = len(encode_json(articles))
+        if country not in self.recency:
+            self.recency[country] = None
+    
+    def _drop_views(self, country: str) -> None:
+        """Forget the derived representations and bookkeeping of a country"""
+        self.summaries.pop(country, None)
+        self.bodies.pop(country, None)
+        self.article_bytes.pop(country, None)
+        self.recency.pop(country, None)
+    
+    def get_entry_bytes(self, country: str) -> int:
+        """Approximate memory held by a cached country: its articles and the prepared body variants built so far"""
+        bodies = self.bodies.get(country, {})
+        return self.article_bytes.get(country, 0) + sum(body.size() for body in bodies.values())
+    
+    def get_total_bytes(self) -> int:
+        """Approximate memory held by the whole cache"""
+        return sum(self.get_entry_bytes(country) for country in self.article_bytes)
+    
+    def is_complete(self, country: str) -> bool:
+        """
+        Check if the cached list holds every article the country has
+        
+        Args:
+            country: Country code
+            
+        Returns:
+            True if fewer articles than the cache depth were found when caching
+        """
+        country = country.upper()
+        return len(self.cache.get(country, [])) < self.get_cache_depth(country)
+    
+    def has_more_after(self, country: str, limit: int) -> bool:
+        """
+        Check if a country may have articles beyond the first `limit` cached ones
+        
+        Args:
+            country: Country code
+            limit: Number of articles already returned
+            
+        Returns:
+            True if more articles are cached or may exist in Firebase
+        """
+        country = country.upper()
+        return len(self.cache.get(country, [])) > limit or not self.is_complete(country)
+    
+    def get_prepared_body(self, country: str, limit: int, view: str = "full") -> Optional[PreparedBody]:
+        """
+        Get the pre-serialized response body for a cached country
+        
+        Args:
+            country: Country code
+            limit: Requested number of articles
+            view: "full" or "summary"
+            
+        Returns:
+            The prepared body, or None if this request has to be built dynamically
+        """
+        country = country.upper()
+        prepared = self.bodies.get(country, {}).get((view, limit))
+        if prepared is not None and not self.is_negative_cached(country):
+            logger.info("Cache HIT for country %s: serving prepared %s body for limit %d", country, view, limit)
+            self.stats["hits"][country] += 1
+            self.recency.move_to_end(country)
+            return prepared
+        return None
+    
+    def get_newest_published(self, country: str) -> Optional[int]:
+        """
+        Get the datePublishedUnix of a country's newest cached article
+        
+        Args:
+            country: Country code
+            
+        Returns:
+            The unix time, or None if the country has no cached articles
+        """
+        articles = self.cache.get(country.upper())
+        if not articles:
+            return None
+        # Cached lists are kept sorted newest first
+        return article_sort_key(articles[0])[0]
+    
+    def merged_articles(self, country: str, new_articles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Merge newly fetched articles into a copy of a country's cached list
+        
+        New articles replace cached ones with the same id. The result is not
+        trimmed or stored; pass it to set_articles / set_many_articles for that.
+        
+        Args:
+            country: Country code
+            new_articles: Articles fetched since the newest cached one
+            
+        Returns:
+            The merged articles, newest first
+        """
+        merged = {article.get("id"): article for article in self.cache.get(country.upper(), [])}
+        merged.update((article.get("id"), article) for article in new_articles)
+        return sorted(merged.values(), key=article_sort_key, reverse=True)
+    
+    def get_article_version(self, country: str) -> Any:
+        """
+        Get the articleVersion stamp a country's cached articles were loaded at
+        
+        Args:
+            country: Country code
+            
+        Returns:
+            The stamp, or None if it isn't known
+        """
+        return self.article_versions.get(country.upper())
+    
+    def mark_refreshed(self, country: str) -> None:
+        """
+        Record that a cached country was found unchanged, restarting its TTL
+        
+        Nothing is saved: after a restart the country is simply rechecked.
+        
+        Args:
+            country: Country code
+        """
+        country = country.upper()
+        if country in self.cache:
+            self.last_refresh_time[country] = time.time()
+            logger.info(f"Country {country} is unchanged since its last refresh")
+    
+    def get_last_refresh_time(self, country: str) -> Optional[float]:
+        """
+        Get when a country's cached articles were last refreshed
+        
+        Args:
+            country: Country code
+            
+        Returns:
+            Unix timestamp of the last refresh, or None if the country isn't cached
+        """
+        return self.last_refresh_time.get(country.upper())
+    
+    def get_cache_depth(self, country: str) -> int:
+        """
+        Get the number of articles cached for a country
+        
+        Args:
+            country: Country code
+            
+        Returns:
+            The country's configured depth, or the default depth
+        """
+        return self.cache_depths.get(country.upper(), self.default_depth)
+    
+    def set_cache_depths(self, depths: Dict[str, int]) -> None:
+        """
+        Set the cache depth for one or more countries
+        
+        Cached lists longer than a lowered depth are trimmed. A cached list that may
+        stop short of a raised depth is dropped, so the next refresh or read-through
+        fetches the new depth.
+        
+        Args:
+            depths: Mapping of country code to number of articles to cache
+        """
+        logger.info(f"Updating cache depths: {depths}")
+        for country, depth in depths.items():
+            country = country.upper()
+            old_depth = self.get_cache_depth(country)
+            self.cache_depths[country] = depth
+            self.settings_dirty = True
+            if country not in self.cache:
+                continue
+            self.dirty_countries.add(country)
+            if len(self.cache[country]) > depth:
+                logger.info(f"Trimming cached articles for {country} to new depth {depth}")
+                self.cache[country] = self.cache[country][:depth]
+                self._build_views(country)
+            elif depth > old_depth and len(self.cache[country]) >= old_depth:
+                logger.info(f"Dropping cached articles for {country} until they are fetched at new depth {depth}")
+                del self.cache[country]
+                self.last_refresh_time.pop(country, None)
+                self.article_versions.pop(country, None)
+                self._drop_views(country)
+            else:
+                self._build_views(country)
+        self._save_cache()
+    
+    def set_negative(self, country: str) -> None:
+        """
+        Remember that a country has no articles for negative_ttl seconds
+        
+        Args:
+            country: Country code
+        """
+        country = country.upper()
+        self.negative_cache[country] = time.time() + self.negative_ttl
+        logger.info(f"Negative cache entry set for country {country} for {self.negative_ttl} seconds")
+    
+    def is_negative_cached(self, country: str) -> bool:
+        """
+        Check if a country has an unexpired negative entry
+        
+        Args:
+            country: Country code
+            
+        Returns:
+            True if the country is currently known to have no articles
+        """
+        country = country.upper()
+        expires_at = self.negative_cache.get(country)
+        if expires_at is None:
+            return False
+        if expires_at <= time.time():
+            del self.negative_cache[country]
+            return False
+        return True
+    
+    def store_fetched_articles(self, country: str, articles: List[Dict[str, Any]]) -> None:
+        """
+        Read-through hook for articles fetched from Firebase after a cache miss
+        
+        Empty results get a short-lived negative entry for any country; non-empty
+        results populate the cache when read-through is enabled and the country is
+        whitelisted. Countries that are already cached are left alone: refreshes keep
+        them current, and replacing them here (e.g. after a read deeper than the
+        cache depth) would drop their article version and restart their TTL.
+        
+        Args:
+            country: Country code
+            articles: The articles fetched from Firebase, newest first
+        """
+        country = country.upper()
+        if country in self.cache:
+            return
+        if not articles:
+            self.set_negative(country)
+        elif self.read_through and self.can_cache(country):
+            logger.info(f"Read-through: populating cache for country {country}")
+            self.set_articles(country, articles)
     
     def set_whitelisted_countries(self, countries: List[str]) -> None:
         """
@@ -191,36 +629,106 @@ class ArticleCache:
         # Get the current whitelist for comparison
         old_whitelist = self.whitelisted_countries.copy()
         
-        # Update the whitelist
+        # Update the whitelist; pinned countries don't also take automatic slots
         self.whitelisted_countries = {country.upper() for country in countries}
+        self.auto_whitelisted_countries -= self.whitelisted_countries
+        self.settings_dirty = True
         
         # Identify added and removed countries
         added = [country for country in self.whitelisted_countries if country not in old_whitelist]
-        removed = [country for country in old_whitelist if country not in self.whitelisted_countries]
+        removed = [country for country in old_whitelist if not self._is_whitelisted(country)]
         
         if added:
             logger.info(f"Added countries to whitelist: {added}")
         if removed:
             logger.info(f"Removed countries from whitelist: {removed}")
-            # Remove non-whitelisted countries from cache
-            for country in removed:
-                if country in self.cache:
-                    logger.info(f"Removing {country} from cache as it is no longer whitelisted")
-                    del self.cache[country]
-                    if country in self.last_refresh_time:
-                        del self.last_refresh_time[country]
+            self._demote(removed)
         
         logger.info(f"Whitelisted countries updated to: {list(self.whitelisted_countries)}")
         self._save_cache()
     
+    def _demote(self, countries: List[str]) -> None:
+        """
+        Handle countries that are no longer whitelisted
+        
+        Under the "whitelist" policy they are removed from the cache; other policies
+        keep them as ordinary, evictable entries.
+        """
+        if self.policy != "whitelist":
+            self._make_room()
+            return
+        # Remove non-whitelisted countries from cache
+        for country in countries:
+            if country in self.cache:
+                logger.info(f"Removing {country} from cache as it is no longer whitelisted")
+                del self.cache[country]
+                self.dirty_countries.add(country)
+                self._drop_views(country)
+                if country in self.last_refresh_time:
+                    del self.last_refresh_time[country]
+                self.article_versions.pop(country, None)
+    
+    def record_request(self, country: str) -> None:
+        """
+        Count a request for a country's articles towards its popularity
+        
+        Args:
+            country: Country code
+        """
+        self.frequency.record(country.upper())
+        if self.auto_whitelist_size > 0 and time.time() >= self.next_auto_whitelist_update:
+            self.update_auto_whitelist()
+    
+    def update_auto_whitelist(self) -> None:
+        """
+        Whitelist the most requested countries, up to auto_whitelist_size of them
+        
+        Countries qualify once their decayed request count reaches
+        auto_whitelist_min_requests. An automatically whitelisted country keeps its
+        slot until a more requested country needs it, so rankings that are close
+        don't churn the cache. Pinned countries don't take slots.
+        """
+        self.next_auto_whitelist_update = time.time() + self.auto_whitelist_interval
+        pinned = self.whitelisted_countries
+        candidates = {country for country, count in self.frequency.top(self.auto_whitelist_size + len(pinned))
+                      if count >= self.auto_whitelist_min_requests and country not in pinned}
+        ranked = sorted(candidates | (self.auto_whitelisted_countries - pinned),
+                        key=lambda country: (self.frequency.estimate(country),
+                                             country in self.auto_whitelisted_countries),
+                        reverse=True)
+        new_auto = set(ranked[:self.auto_whitelist_size])
+        
+        added = sorted(new_auto - self.auto_whitelisted_countries)
+        removed = sorted(self.auto_whitelisted_countries - new_auto)
+        if not added and not removed:
+            return
+        
+        self.auto_whitelisted_countries = new_auto
+        self.settings_dirty = True
+        if added:
+            logger.info(f"Automatically whitelisted popular countries: {added}")
+        if removed:
+            logger.info(f"Demoted countries from the automatic whitelist: {removed}")
+            self._demote(removed)
+        self._save_cache()
+    
+    def get_cached_countries(self) -> List[str]:
+        """
+        Get the countries currently held in the cache
+        
+        Returns:
+            List of country codes
+        """
+        return list(self.cache)
+    
     def get_whitelisted_countries(self) -> List[str]:
         """
-        Get the list of whitelisted countries
+        Get the list of whitelisted countries, pinned and automatic
         
         Returns:
             List of country codes
         """
-        countries = list(self.whitelisted_countries)
+        countries = list(self.whitelisted_countries | self.auto_whitelisted_countries)
         logger.info(f"Retrieved {len(countries)} whitelisted countries: {countries}")
         return countries
     
@@ -235,7 +743,7 @@ class ArticleCache:
             True if the country is whitelisted, False otherwise
         """
         country = country.upper()
-        is_whitelisted = country in self.whitelisted_countries
+        is_whitelisted = self._is_whitelisted(country)
         logger.info(f"Checking if country {country} is whitelisted: {is_whitelisted}")
         return is_whitelisted
     
@@ -250,7 +758,7 @@ class ArticleCache:
         
         # Get basic status information
         cached_countries = list(self.cache.keys())
-        whitelisted_countries = list(self.whitelisted_countries)
+        whitelisted_countries = list(self.whitelisted_countries | self.auto_whitelisted_countries)
         
         # Calculate additional statistics
         total_articles = sum(len(articles) for articles in self.cache.values())
@@ -261,12 +769,31 @@ class ArticleCache:
         status = {
             "cached_countries": cached_countries,
             "whitelisted_countries": whitelisted_countries,
+            "pinned_countries": list(self.whitelisted_countries),
+            "auto_whitelisted_countries": list(self.auto_whitelisted_countries),
+            "auto_whitelist_size": self.auto_whitelist_size,
+            "popular_countries": {country: round(count, 2) for country, count in self.frequency.top(10)},
             "total_articles": total_articles,
             "articles_per_country": articles_per_country,
             "cache_coverage": cache_coverage,
+            "default_cache_depth": self.default_depth,
+            "cache_depths": self.cache_depths,
+            "negative_cached_countries": [country for country in list(self.negative_cache) if self.is_negative_cached(country)],
+            "eviction_policy": self.policy,
+            "max_bytes": self.max_bytes,
+            "total_bytes": self.get_total_bytes(),
+            "bytes_per_country": {country: self.get_entry_bytes(country) for country in self.article_bytes},
+            "hit_ratio": None,
             "last_refresh_time": {}
         }
         
+        # Hit, miss, eviction and rejection counters, in total and per country
+        for name, counter in self.stats.items():
+            status[name] = sum(counter.values())
+            status[f"{name}_per_country"] = dict(counter)
+        if status["hits"] + status["misses"]:
+            status["hit_ratio"] = round(status["hits"] / (status["hits"] + status["misses"]), 4)
+        
         # Convert timestamps to human-readable format
         for country, timestamp in self.last_refresh_time.items():
             status["last_refresh_time"][country] = {
@@ -290,8 +817,15 @@ class ArticleCache:
         logger.info(f"Countries being cleared: {cached_countries}")
         
         # Clear the cache
+        self.dirty_countries.update(cached_countries)
         self.cache = {}
+        self.summaries = {}
+        self.bodies = {}
+        self.article_bytes = {}
+        self.recency = OrderedDict()
         self.last_refresh_time = {}
+        self.article_versions = {}
+        self.negative_cache = {}
         
         # Save the empty cache
         self._save_cache()
@@ -0,0 +1,197 @@
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+from typing import Any, Dict, Iterable, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+# Cache-wide settings, persisted apart from the per-country entries
+SETTINGS_KEYS = ("whitelisted_countries", "auto_whitelisted_countries", "cache_depths")
+
+
+def empty_cache_data() -> Dict[str, Any]:
+    """The persisted state of an empty cache, in the legacy article_cache.json layout"""
+    return {
+        "articles": {},
+        "last_refresh_time": {},
+        "article_versions": {},
+        "whitelisted_countries": [],
+        "auto_whitelisted_countries": [],
+        "cache_depths": {}
+    }
+
+
+class CacheStore:
+    """
+    Persistence backend for ArticleCache
+
+    State is exchanged in the layout of the original article_cache.json file:
+    per-country "articles", "last_refresh_time" and "article_versions" maps, plus
+    the "whitelisted_countries", "auto_whitelisted_countries" and "cache_depths"
+    settings.
+    """
+
+    def load(self) -> Dict[str, Any]:
+        """Load the persisted cache state"""
+        raise NotImplementedError
+
+    def save(self, data: Dict[str, Any], countries: Iterable[str], settings: bool) -> None:
+        """
+        Persist changes to the cache state
+
+        Args:
+            data: The full current cache state
+            countries: Countries whose entries changed (countries missing from
+                data["articles"] were removed)
+            settings: Whether the whitelist or cache depths changed
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release any resources held by the store"""
+
+
+class JSONCacheStore(CacheStore):
+    """
+    Store the whole cache in a single JSON file
+
+    Every save rewrites the file, so its cost grows with the cache. The file is
+    written to a temporary file and renamed over the old one, so a crash mid-write
+    leaves the previous version intact.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the store
+
+        Args:
+            path: Path to the cache file
+        """
+        self.path = path
+
+    def load(self) -> Dict[str, Any]:
+        data = empty_cache_data()
+        if not os.path.exists(self.path):
+            logger.info(f"Cache file does not exist at {self.path}, initializing empty cache")
+            return data
+        with open(self.path, 'r') as f:
+            data.update(json.load(f))
+        logger.info(f"Cache loaded from {self.path}")
+        return data
+
+    def save(self, data: Dict[str, Any], countries: Iterable[str], settings: bool) -> None:
+        cache_dir = os.path.dirname(self.path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir or ".", prefix=".article_cache.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f, separators=(",", ":"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        logger.info(f"Cache successfully saved to {self.path}")
+
+
+class SQLiteCacheStore(CacheStore):
+    """
+    Store the cache in SQLite, one row per country
+
+    Saves only touch the rows of countries that changed, so their cost is
+    proportional to the change rather than to the whole cache. The database runs
+    in WAL mode, and each save is a single transaction.
+    """
+
+    def __init__(self, path: str, legacy_json_path: Optional[str] = None):
+        """
+        Initialize the store, creating the database if needed
+
+        Args:
+            path: Path to the SQLite database
+            legacy_json_path: article_cache.json to import when the database is new
+        """
+        self.path = path
+        self.legacy_json_path = legacy_json_path
+        db_dir = os.path.dirname(path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS countries ("
+                "country TEXT PRIMARY KEY, articles TEXT NOT NULL, "
+                "last_refresh_time REAL, article_version TEXT)"
+            )
+            self.conn.execute("CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    def load(self) -> Dict[str, Any]:
+        if self._is_empty() and self.legacy_json_path and os.path.exists(self.legacy_json_path):
+            self._migrate_legacy_json()
+
+        data = empty_cache_data()
+        for country, articles, last_refresh, version in self.conn.execute(
+                "SELECT country, articles, last_refresh_time, article_version FROM countries"):
+            data["articles"][country] = json.loads(articles)
+            if last_refresh is not None:
+                data["last_refresh_time"][country] = last_refresh
+            if version is not None:
+                data["article_versions"][country] = json.loads(version)
+        for key, value in self.conn.execute("SELECT key, value FROM settings"):
+            data[key] = json.loads(value)
+        logger.info(f"Cache loaded from {self.path}")
+        return data
+
+    def save(self, data: Dict[str, Any], countries: Iterable[str], settings: bool) -> None:
+        countries = list(countries)
+        with self.conn:
+            for country in countries:
+                articles = data["articles"].get(country)
+                if articles is None:
+                    self.conn.execute("DELETE FROM countries WHERE country = ?", (country,))
+                    continue
+                version = data["article_versions"].get(country)
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO countries (country, articles, last_refresh_time, article_version) "
+                    "VALUES (?, ?, ?, ?)",
+                    (
+                        country,
+                        json.dumps(articles, separators=(",", ":")),
+                        data["last_refresh_time"].get(country),
+                        json.dumps(version) if version is not None else None
+                    )
+                )
+            if settings:
+                for key in SETTINGS_KEYS:
+                    self.conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                                      (key, json.dumps(data[key])))
+        logger.info(f"Cache saved to {self.path}: {len(countries)} countries updated"
+                    f"{', settings updated' if settings else ''}")
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def _is_empty(self) -> bool:
+        """Check whether nothing has been stored yet"""
+        countries = self.conn.execute("SELECT COUNT(*) FROM countries").fetchone()[0]
+        settings = self.conn.execute("SELECT COUNT(*) FROM settings").fetchone()[0]
+        return countries == 0 and settings == 0
+
+    def _migrate_legacy_json(self) -> None:
+        """Import an existing article_cache.json into the database"""
+        logger.info(f"Migrating cache from {self.legacy_json_path} to {self.path}")
+        try:
+            data = JSONCacheStore(self.legacy_json_path).load()
+            self.save(data, data["articles"].keys(), settings=True)
+            logger.info(f"Migrated {len(data['articles'])} countries from {self.legacy_json_path}")
+        except Exception as e:
+            logger.error(f"Error migrating cache from {self.legacy_json_path}: {e}")
@@ -0,0 +1,192 @@
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+import httpx
+
+from app.firebase_client import key_order
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class FakeRealtimeDatabase:
+    """
+    In-memory stand-in for the Firebase Realtime Database REST API
+
+    Serves GET requests for `{path}.json` with the query parameters the backend
+    uses (shallow, orderBy, limitToFirst, limitToLast, startAt, endAt, equalTo)
+    and enforces `.indexOn` rules for child ordering the same way the real
+    database does. Plug it into AsyncFirebaseClient through `transport()` to run
+    the backend or its read paths offline.
+    """
+
+    def __init__(self, data: Optional[Dict[str, Any]] = None, rules: Optional[Dict[str, Any]] = None):
+        """
+        Initialize the fake database
+
+        Args:
+            data: The database contents, as exported from the Firebase console
+            rules: Security rules document ({"rules": {...}}); only `.indexOn` is used
+        """
+        self.data = data or {}
+        self.rules = (rules or {}).get("rules", {})
+        self.requests: List[str] = []
+
+    @classmethod
+    def from_files(cls, data_path: str, rules_path: Optional[str] = None) -> "FakeRealtimeDatabase":
+        """
+        Load a fake database from a JSON export and an optional rules file
+
+        Args:
+            data_path: Path to a JSON export of the database
+            rules_path: Path to a database.rules.json file
+        """
+        logger.info(f"Loading fake Realtime Database from {data_path}")
+        with open(data_path, 'r') as f:
+            data = json.load(f)
+        rules = None
+        if rules_path:
+            with open(rules_path, 'r') as f:
+                rules = json.load(f)
+        return cls(data, rules)
+
+    def transport(self) -> httpx.MockTransport:
+        """Get an httpx transport that answers requests from this database"""
+        return httpx.MockTransport(self.handle)
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        """Answer a single REST request"""
+        self.requests.append(str(request.url))
+        if request.method != "GET":
+            return self._error(405, f"Method {request.method} is not supported by the fake database")
+
+        path = unquote(request.url.path)
+        if not path.endswith(".json"):
+            return self._error(404, "Not found")
+        parts = [part for part in path[:-len(".json")].split("/") if part]
+
+        node = self._resolve(parts)
+        params = request.url.params
+
+        if params.get("shallow") == "true":
+            if len(params) > 1:
+                return self._error(400, "Mixing shallow with other query parameters is not allowed")
+            return self._json(self._shallow(node))
+
+        if "orderBy" in params:
+            try:
+                node = self._query(parts, node, params)
+            except ValueError as e:
+                return self._error(400, str(e))
+
+        return self._json(node)
+
+    def _resolve(self, parts: List[str]) -> Any:
+        """Walk the data tree down to a path"""
+        node: Any = self.data
+        for part in parts:
+            if isinstance(node, dict):
+                node = node.get(part)
+            elif isinstance(node, list) and part.isdigit() and int(part) < len(node):
+                node = node[int(part)]
+            else:
+                return None
+        return node
+
+    def _shallow(self, node: Any) -> Any:
+        """Replace every child value with true, as `shallow=true` does"""
+        if isinstance(node, list):
+            node = {str(i): value for i, value in enumerate(node)}
+        if isinstance(node, dict):
+            return {key: True if isinstance(value, (dict, list)) else value for key, value in node.items()}
+        return node
+
+    def _indexed_on(self, parts: List[str]) -> List[str]:
+        """Get the `.indexOn` entries that apply to a path, matching `$wildcards`"""
+        rules = self.rules
+        for part in parts:
+            if not isinstance(rules, dict):
+                return []
+            if part in rules:
+                rules = rules[part]
+            else:
+                wildcard = next((key for key in rules if key.startswith("$")), None)
+                if wildcard is None:
+                    return []
+                rules = rules[wildcard]
+        index_on = rules.get(".indexOn", []) if isinstance(rules, dict) else []
+        return [index_on] if isinstance(index_on, str) else list(index_on)
+
+    def _query(self, parts: List[str], node: Any, params: httpx.QueryParams) -> Any:
+        """Apply orderBy / range / limit parameters to the children of a node"""
+        order_by = json.loads(params["orderBy"])
+        if not isinstance(node, dict):
+            return node
+
+        # Range bounds are compared with the first element of the sort key
+        bound_key = _order_key
+        if order_by == "$key":
+            bound_key = key_order
+
+            def sort_key(item: Tuple[str, Any]) -> Tuple:
+                return key_order(item[0])
+        elif order_by == "$value":
+            def sort_key(item: Tuple[str, Any]) -> Tuple:
+                return _order_key(item[1]) + _order_key(item[0])
+        else:
+            if order_by not in self._indexed_on(parts):
+                raise ValueError(
+                    f'Index not defined, add ".indexOn": "{order_by}", for path "/{"/".join(parts)}", to the rules'
+                )
+            child_parts = order_by.split("/")
+
+            def sort_key(item: Tuple[str, Any]) -> Tuple:
+                value = item[1]
+                for part in child_parts:
+                    value = value.get(part) if isinstance(value, dict) else None
+                return _order_key(value) + _order_key(item[0])
+
+        children = sorted(node.items(), key=sort_key)
+        if "equalTo" in params:
+            target = bound_key(json.loads(params["equalTo"]))
+            children = [child for child in children if sort_key(child)[:2] == target]
+        if "startAt" in params:
+            start = bound_key(json.loads(params["startAt"]))
+            children = [child for child in children if sort_key(child)[:2] >= start]
+        if "endAt" in params:
+            end = bound_key(json.loads(params["endAt"]))
+            children = [child for child in children if sort_key(child)[:2] <= end]
+
+        if "limitToFirst" in params:
+            children = children[:int(params["limitToFirst"])]
+        if "limitToLast" in params:
+            limit = int(params["limitToLast"])
+            children = children[-limit:] if limit else []
+
+        # Like the real REST API, the result is an unordered JSON object
+        return {key: value for key, value in children}
+
+    def _json(self, value: Any) -> httpx.Response:
+        return httpx.Response(200, content=json.dumps(value).encode("utf-8"),
+                              headers={"Content-Type": "application/json; charset=utf-8"})
+
+    def _error(self, status_code: int, message: str) -> httpx.Response:
+        return httpx.Response(status_code, content=json.dumps({"error": message}).encode("utf-8"),
+                              headers={"Content-Type": "application/json; charset=utf-8"})
+
+
+def _order_key(value: Any) -> Tuple[int, Any]:
+    """Sort key following the Realtime Database ordering of value types"""
+    if value is None:
+        return (0, 0)
+    if value is False:
+        return (1, 0)
+    if value is True:
+        return (2, 0)
+    if isinstance(value, (int, float)):
+        return (3, value)
+    if isinstance(value, str):
+        return (4, value)
+    return (5, 0)
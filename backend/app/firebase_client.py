@@ -1,63 +1,401 @@
-import pyrebase
+import asyncio
+import contextvars
+import functools
+import re
+import time
+import httpx
 import json
 import logging
 import os
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Set, Tuple, AsyncIterator
+from urllib.parse import quote
 from dotenv import load_dotenv
 
+from app.metrics import FIREBASE_BYTES, FIREBASE_DURATION, FIREBASE_REQUESTS
+from app.server_timing import span
+from app.read_budget import ReadBudget, ReadBudgetExceeded, current_client
+
 # Load environment variables from .env file
 load_dotenv()
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# Firebase configuration from environment variables
-firebase_config = {
-    "apiKey": os.getenv("FIREBASE_API_KEY"),
-    "authDomain": os.getenv("FIREBASE_AUTH_DOMAIN"),
-    "databaseURL": os.getenv("FIREBASE_DATABASE_URL"),
-    "storageBucket": os.getenv("FIREBASE_STORAGE_BUCKET")
-}
-
-class FirebaseClient:
-    def __init__(self):
-        logger.info("Initializing Firebase client")
-        # Initialize Firebase
-        self.firebase = pyrebase.initialize_app(firebase_config)
-        # Get a reference to the database service
-        self.db = self.firebase.database()
-        logger.info("Firebase client initialized successfully")
-    
-    def get_all_data(self) -> Dict[str, Any]:
+# Realtime Database the REST client reads from
+FIREBASE_DATABASE_URL = os.getenv("FIREBASE_DATABASE_URL")
+
+# Connection pool settings for the async REST client
+FIREBASE_HTTP_TIMEOUT = float(os.getenv("FIREBASE_HTTP_TIMEOUT", "30"))
+FIREBASE_MAX_CONNECTIONS = int(os.getenv("FIREBASE_MAX_CONNECTIONS", "20"))
+FIREBASE_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("FIREBASE_MAX_KEEPALIVE_CONNECTIONS", "10"))
+
+# Number of IDs the ingestion pipeline keeps in articleIndex/{country}/latestArticles
+# (MAX_RECENT_ARTICLES in data/process_scrapers.py)
+ARTICLE_INDEX_SIZE = int(os.getenv("ARTICLE_INDEX_SIZE", "20"))
+
+# Keys of date buckets under articles/{country} (as opposed to article IDs)
+DATE_BUCKET_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+# Child used for server-side ordering; needs the ".indexOn" rule in database.rules.json
+ORDER_BY_PUBLISHED = "metadata/datePublishedUnix"
+FIREBASE_USE_QUERIES = os.getenv("FIREBASE_USE_QUERIES", "true").lower() == "true"
+
+# AsyncFirebaseClient method the current REST reads are made for, used as the metrics label
+_client_method: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("client_method", default=None)
+
+
+def track_method(func):
+    """
+    Attribute the REST reads of an AsyncFirebaseClient method to it in the metrics
+    
+    The outermost tracked method wins, so the reads of get_recent_articles_by_country
+    are counted under it even when it delegates to another public method.
+    """
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        if _client_method.get() is not None:
+            return await func(*args, **kwargs)
+        token = _client_method.set(func.__name__)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            _client_method.reset(token)
+    return wrapper
+
+
+@span("process")
+def flatten_country_articles(country_articles: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Flatten a country subtree ({date: {article_id: article}}) into a list of articles
+    
+    Articles stored directly under the country ({article_id: article}, as written by
+    the ingestion pipeline) are flattened too, filed under their datePublished.
+    
+    Args:
+        country_articles: The raw data stored under articles/{country}
+        
+    Returns:
+        A list of articles with "date" and "id" added to each one
+    """
+    all_articles = []
+    
+    # Iterate through dates
+    for date_str, date_data in country_articles.items():
+        # Check if date_data is a dictionary before iterating
+        if not isinstance(date_data, dict):
+            continue
+        
+        # An article stored without a date bucket
+        if "metadata" in date_data:
+            all_articles.append(build_article(date_str, date_data, date_data["metadata"].get("datePublished", "")))
+            continue
+            
+        # Iterate through articles for this date
+        for article_id, article_data in date_data.items():
+            # Make sure we have valid article data
+            if not isinstance(article_data, dict):
+                continue
+                
+            all_articles.append(build_article(article_id, article_data, date_str))
+    
+    return all_articles
+
+
+def build_article(article_id: str, article_data: Dict[str, Any], date_str: str) -> Dict[str, Any]:
+    """
+    Build the API representation of a stored article
+    
+    Args:
+        article_id: The article's key in the database
+        article_data: The stored article node
+        date_str: The date the article is filed under
+        
+    Returns:
+        The article's metadata, content, factCheck and media plus "date" and "id"
+    """
+    # Create a new article object with the necessary data
+    article = {}
+    
+    # Copy the metadata, content, factCheck, and media if they exist
+    if "metadata" in article_data:
+        article["metadata"] = article_data["metadata"]
+    if "content" in article_data:
+        article["content"] = article_data["content"]
+    if "factCheck" in article_data:
+        article["factCheck"] = article_data["factCheck"]
+    if "media" in article_data:
+        article["media"] = article_data["media"]
+    
+    # Add date and id to the article data
+    article["date"] = date_str
+    article["id"] = article_id
+    
+    return article
+
+
+def key_order(key: str) -> Tuple[int, Any]:
+    """Sort key matching the database's orderBy="$key" (integer-like keys first, numerically)"""
+    if key.lstrip("-").isdigit() and -2**31 <= int(key) < 2**31:
+        return (0, int(key))
+    return (1, key)
+
+
+def article_sort_key(article: Dict[str, Any]) -> Tuple[int, str]:
+    """Total order of articles: publication time, then id to break ties"""
+    return (int(article.get("metadata", {}).get("datePublishedUnix", 0) or 0), str(article.get("id", "")))
+
+
+@span("process")
+def sort_articles_newest_first(articles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Sort articles by metadata.datePublishedUnix (then id), newest first"""
+    articles.sort(key=article_sort_key, reverse=True)
+    return articles
+
+
+class AsyncFirebaseClient:
+    """
+    Non-blocking Firebase Realtime Database client
+    
+    Talks to the Realtime Database REST API through a pooled httpx.AsyncClient so
+    that a slow read only suspends the request waiting on it, not the event loop.
+    """
+    
+    def __init__(self, database_url: Optional[str] = None, transport: Optional[httpx.AsyncBaseTransport] = None,
+                 use_queries: bool = FIREBASE_USE_QUERIES, budget: Optional[ReadBudget] = None):
+        """
+        Initialize the async Firebase client
+        
+        Args:
+            database_url: Realtime Database URL (defaults to FIREBASE_DATABASE_URL)
+            transport: Optional httpx transport, used to point the client at a fake database
+            use_queries: Whether to use server-side ordered queries (needs the ".indexOn" rules)
+            budget: Optional read budget every read is accounted to; reads are refused
+                once it is exhausted
+        """
+        self.database_url = (database_url or FIREBASE_DATABASE_URL or "").rstrip("/")
+        self.use_queries = use_queries
+        self.budget = budget
+        # Countries whose data can't be answered by ordered queries (missing index or date-bucket layout)
+        self.query_unsupported: Set[str] = set()
+        # Whether each country checked so far stores any articles in date buckets
+        self.date_buckets: Dict[str, bool] = {}
+        logger.info(f"Initializing async Firebase client for {self.database_url}")
+        self.http = httpx.AsyncClient(
+            base_url=self.database_url,
+            timeout=FIREBASE_HTTP_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=FIREBASE_MAX_CONNECTIONS,
+                max_keepalive_connections=FIREBASE_MAX_KEEPALIVE_CONNECTIONS
+            ),
+            transport=transport
+        )
+        logger.info("Async Firebase client initialized successfully")
+    
+    async def close(self) -> None:
+        """Close the underlying connection pool"""
+        logger.info("Closing async Firebase client")
+        await self.http.aclose()
+    
+    async def _get(self, path: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        Read a node through the REST API
+        
+        Args:
+            path: Slash-separated database path (empty string for the root)
+            params: Optional REST query parameters
+            
+        Returns:
+            The decoded JSON value of the node (None if it does not exist)
+            
+        Raises:
+            ReadBudgetExceeded: If the read budget is exhausted
+        """
+        url = f"/{quote(path)}.json" if path else "/.json"
+        method = _client_method.get() or "_get"
+        if self.budget is not None:
+            self.budget.check()
+        with span("firebase"):
+            start = time.perf_counter()
+            try:
+                response = await self.http.get(url, params=params)
+            except httpx.HTTPError:
+                FIREBASE_REQUESTS.inc((method, "error"))
+                raise
+            finally:
+                FIREBASE_DURATION.observe(time.perf_counter() - start, (method,))
+            FIREBASE_REQUESTS.inc((method, str(response.status_code)))
+            FIREBASE_BYTES.inc((method,), len(response.content))
+            if self.budget is not None:
+                self.budget.record(len(response.content), current_client())
+            response.raise_for_status()
+            return response.json()
+    
+    @track_method
+    async def get_shallow(self, path: str) -> Dict[str, Any]:
+        """
+        List the children of a node without downloading them (shallow=true)
+        
+        Args:
+            path: Slash-separated database path (empty string for the root)
+            
+        Returns:
+            Mapping of child key to True for nested children, or to the value itself
+            for primitive children; empty if the node doesn't exist
+        """
+        shallow = await self._get(path, {"shallow": "true"})
+        return shallow if isinstance(shallow, dict) else {}
+    
+    @track_method
+    async def get_children_page(self, path: str, page_size: int, after: Optional[str] = None) -> List[Tuple[str, Any]]:
+        """
+        Read one page of the children of a node, in key order
+        
+        A single orderBy="$key" read with startAt/limitToFirst, so only the page
+        itself is downloaded.
+        
+        Args:
+            path: Slash-separated database path
+            page_size: Number of children to read
+            after: Only return children whose key comes after this one
+            
+        Returns:
+            (key, value) pairs in key order
+        """
+        params: Dict[str, Any] = {"orderBy": json.dumps("$key")}
+        if after is None:
+            params["limitToFirst"] = page_size
+        else:
+            # startAt is inclusive: read one extra child and drop the one already returned
+            params["startAt"] = json.dumps(after)
+            params["limitToFirst"] = page_size + 1
+        page = await self._get(path, params)
+        if not isinstance(page, dict):
+            return []
+        
+        keys = [key for key in sorted(page, key=key_order) if key != after]
+        return [(key, page[key]) for key in keys[:page_size]]
+    
+    async def iter_children(self, path: str, page_size: int) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Iterate over the children of a node, page_size children per read
+        
+        At most one page of the node is held in memory at a time.
+        
+        Args:
+            path: Slash-separated database path
+            page_size: Number of children read per request
+            
+        Yields:
+            (key, value) pairs in key order
+        """
+        after: Optional[str] = None
+        while True:
+            children = await self.get_children_page(path, page_size, after)
+            for key, value in children:
+                yield key, value
+            if len(children) < page_size:
+                return
+            after = children[-1][0]
+    
+    @track_method
+    async def get_article_counts(self, country: str, concurrency: int = 10) -> Dict[str, Any]:
+        """
+        Count a country's articles without downloading any article bodies
+        
+        Lists the country with shallow=true, then lists each date bucket the same
+        way (at most `concurrency` at a time). Article IDs stored directly under the
+        country are counted from the first listing.
+        
+        Args:
+            country: The country to count articles for
+            concurrency: Maximum number of concurrent shallow reads of date buckets
+            
+        Returns:
+            Dictionary with date_count, article_count and articles_per_date
+        """
+        logger.info(f"Counting articles for country {country} with shallow reads")
+        try:
+            children = await self.get_shallow(f"articles/{country}")
+            dates = sorted((key for key in children if DATE_BUCKET_PATTERN.match(key)), key=key_order)
+            undated_count = sum(1 for key in children if not DATE_BUCKET_PATTERN.match(key))
+            
+            semaphore = asyncio.Semaphore(concurrency)
+            
+            async def count_date(date_str: str) -> int:
+                async with semaphore:
+                    return len(await self.get_shallow(f"articles/{country}/{date_str}"))
+            
+            date_counts = await asyncio.gather(*[count_date(date_str) for date_str in dates])
+            articles_per_date = dict(zip(dates, date_counts))
+            article_count = sum(date_counts) + undated_count
+            
+            logger.info(f"Counted articles for country {country}: {len(dates)} dates, {article_count} total articles")
+            return {
+                "date_count": len(dates),
+                "article_count": article_count,
+                "articles_per_date": articles_per_date
+            }
+        except ReadBudgetExceeded:
+            raise
+        except Exception as e:
+            logger.error(f"Error counting articles for country {country}: {e}")
+            raise Exception(f"Error counting articles for country {country}: {e}")
+    
+    async def iter_export(self, page_size: int = 100) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Walk the whole database in bounded pages, for streaming exports
+        
+        Top-level nodes and their children (e.g. articles/{country}) are listed with
+        shallow reads; the grandchildren (e.g. the articles of one country) are then
+        read page by page.
+        
+        Args:
+            page_size: Number of children read per request
+            
+        Yields:
+            Records {"path": parent path, "key": child key, "value": child value}
+        """
+        logger.info(f"Starting paged export of the database with page size {page_size}")
+        for top_key, top_value in (await self.get_shallow("")).items():
+            if top_value is not True:
+                yield {"path": "", "key": top_key, "value": top_value}
+                continue
+            for child_key, child_value in (await self.get_shallow(top_key)).items():
+                if child_value is not True:
+                    yield {"path": top_key, "key": child_key, "value": child_value}
+                    continue
+                child_path = f"{top_key}/{child_key}"
+                async for key, value in self.iter_children(child_path, page_size):
+                    yield {"path": child_path, "key": key, "value": value}
+            logger.info(f"Exported top-level node {top_key}")
+    
+    @track_method
+    async def get_all_data(self) -> Dict[str, Any]:
         """Get all data from the database"""
         logger.info("Attempting to retrieve all data from Firebase")
         try:
-            all_data = self.db.get()
-            result = {}
+            result = await self._get("") or {}
             
-            if all_data.each() is not None:
-                for data in all_data.each():
-                    result[data.key()] = data.val()
-                    
             # Log the top-level keys found
             top_level_keys = list(result.keys())
             logger.info(f"Retrieved all data from Firebase with {len(top_level_keys)} top-level keys: {top_level_keys}")
             
             return result
+        except ReadBudgetExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error reading all data from database: {e}")
             raise Exception(f"Error reading from database: {e}")
     
-    def get_articles_by_country(self, country: str) -> Dict[str, Any]:
+    @track_method
+    async def get_articles_by_country(self, country: str) -> Dict[str, Any]:
         """Get all articles for a specific country"""
         logger.info(f"Attempting to retrieve all articles for country: {country}")
         try:
-            articles = self.db.child("articles").child(country).get()
-            if articles.val() is None:
+            articles_data = await self._get(f"articles/{country}")
+            if articles_data is None:
                 logger.info(f"No articles found for country: {country}")
                 return {}
-                
-            articles_data = articles.val()
             
             # Count the number of dates and articles for logging
             if isinstance(articles_data, dict):
@@ -71,14 +409,259 @@ class FirebaseClient:
                 logger.warning(f"Unexpected data structure for country {country} articles")
                 
             return articles_data
+        except ReadBudgetExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error reading articles for country {country}: {e}")
             raise Exception(f"Error reading articles for country {country}: {e}")
     
-    def get_recent_articles_by_country(self, country: str, limit: int) -> List[Dict[str, Any]]:
+    @track_method
+    async def has_date_buckets(self, country: str) -> bool:
+        """
+        Check whether a country stores any of its articles in date buckets
+        
+        Ordered queries and the article index only see articles stored directly
+        under the country, so a country mixing both layouts would silently lose its
+        bucketed articles. Buckets have no metadata/datePublishedUnix and sort first,
+        so an endAt=null range read returns one if any exist and nothing otherwise.
+        Checked once per country; without ordered queries (or the index rule) the
+        layout can't be checked cheaply and the country is assumed flat.
+        
+        Args:
+            country: The country to check
+            
+        Returns:
+            True if the country has date buckets
+        """
+        if not self.use_queries:
+            return False
+        if country not in self.date_buckets:
+            params = {"orderBy": json.dumps(ORDER_BY_PUBLISHED), "endAt": "null", "limitToFirst": 1}
+            try:
+                unordered = await self._get(f"articles/{country}", params)
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code != 400:
+                    raise
+                logger.warning(f"Ordered query rejected for {country}, check the .indexOn rules: {e.response.text}")
+                self.query_unsupported.add(country)
+                unordered = None
+            has_buckets = isinstance(unordered, dict) and any(
+                isinstance(child, dict) and "metadata" not in child for child in unordered.values()
+            )
+            if has_buckets:
+                logger.warning(f"Articles for {country} are (partly) stored in date buckets, reading the whole "
+                               f"country instead of ordered queries and the article index")
+                self.query_unsupported.add(country)
+            self.date_buckets[country] = has_buckets
+        return self.date_buckets[country]
+    
+    @track_method
+    async def get_indexed_recent_articles(self, country: str, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Get the most recent articles for a country through articleIndex/{country}/latestArticles
+        
+        Reads the index node, then only the indexed article nodes, in parallel.
+        The index only lists articles stored flat, so it isn't used for countries
+        with date buckets.
+        
+        Args:
+            country: The country to get articles for
+            limit: The maximum number of articles to return
+            
+        Returns:
+            A list of articles, sorted by date (newest first), or None if the index is
+            missing, too shallow for the limit, or points at articles that no longer
+            exist, or the country has date buckets
+        """
+        if await self.has_date_buckets(country):
+            return None
+        index = await self._get(f"articleIndex/{country}/latestArticles")
+        if not isinstance(index, list) or not index:
+            logger.info(f"No article index for country: {country}")
+            return None
+        
+        # A full index may have more articles behind it; a short one lists everything
+        if limit > len(index) and len(index) >= ARTICLE_INDEX_SIZE:
+            logger.info(f"Article index for {country} holds {len(index)} articles, {limit} requested")
+            return None
+        
+        article_ids = [article_id for article_id in index[:limit] if isinstance(article_id, str)]
+        article_nodes = await asyncio.gather(*[
+            self._get(f"articles/{country}/{article_id}") for article_id in article_ids
+        ])
+        
+        articles = []
+        for article_id, article_data in zip(article_ids, article_nodes):
+            if not isinstance(article_data, dict) or "metadata" not in article_data:
+                logger.warning(f"Article index for {country} references missing article {article_id}")
+                return None
+            date_str = article_data["metadata"].get("datePublished", "")
+            articles.append(build_article(article_id, article_data, date_str))
+        
+        logger.info(f"Retrieved {len(articles)} articles for {country} through the article index")
+        return sort_articles_newest_first(articles)
+    
+    @track_method
+    async def query_articles_by_published(self, country: str, limit: int, end_at: Optional[int] = None,
+                                          start_at: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Get a country's newest articles with a server-side ordered, bounded query
+        
+        Uses orderBy="metadata/datePublishedUnix" with limitToLast (and endAt), so the
+        database sorts and truncates instead of sending the whole country.
+        
+        Args:
+            country: The country to get articles for
+            limit: The maximum number of articles to return
+            end_at: Only include articles published at or before this unix time
+            start_at: Only include articles published at or after this unix time
+            
+        Returns:
+            A list of articles, sorted by date (newest first), or None if the query
+            isn't supported for this country (missing index or date-bucket layout)
+        """
+        if not self.use_queries or await self.has_date_buckets(country) or country in self.query_unsupported:
+            return None
+        
+        params = {"orderBy": json.dumps(ORDER_BY_PUBLISHED), "limitToLast": limit}
+        if end_at is not None:
+            params["endAt"] = json.dumps(end_at)
+        if start_at is not None:
+            params["startAt"] = json.dumps(start_at)
+        
+        try:
+            articles_data = await self._get(f"articles/{country}", params)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code != 400:
+                raise
+            logger.warning(f"Ordered query rejected for {country}, check the .indexOn rules: {e.response.text}")
+            self.query_unsupported.add(country)
+            return None
+        
+        if not articles_data:
+            return []
+        
+        articles = []
+        for article_id, article_data in articles_data.items():
+            # Children without metadata are date buckets, which ordered queries can't see into
+            if not isinstance(article_data, dict) or "metadata" not in article_data:
+                logger.warning(f"Articles for {country} are not stored flat, ordered queries disabled for it")
+                self.query_unsupported.add(country)
+                return None
+            date_str = article_data["metadata"].get("datePublished", "")
+            articles.append(build_article(article_id, article_data, date_str))
+        
+        logger.info(f"Retrieved {len(articles)} articles for {country} through an ordered query")
+        return sort_articles_newest_first(articles)[:limit]
+    
+    @track_method
+    async def get_article_version(self, country: str) -> Any:
+        """
+        Read a country's articleVersion stamp
+        
+        The ingestion pipeline bumps articleVersion/{country} whenever it writes
+        articles for the country, so an unchanged stamp means nothing needs to be
+        refetched. The read costs a few bytes.
+        
+        Args:
+            country: The country to get the version for
+            
+        Returns:
+            The stamp (a server timestamp), or None if the country has none
+        """
+        try:
+            version = await self._get(f"articleVersion/{country}")
+            logger.info(f"Article version for {country}: {version}")
+            return version
+        except ReadBudgetExceeded:
+            raise
+        except Exception as e:
+            logger.error(f"Error retrieving article version for country {country}: {e}")
+            raise Exception(f"Error retrieving article version for country {country}: {e}")
+    
+    @track_method
+    async def get_articles_newer_than(self, country: str, since: int, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Get the articles published since a country's newest cached article
+        
+        A startAt range read, so the download scales with the number of new
+        articles instead of the country's history. The range is inclusive: articles
+        published exactly at `since` are returned again and must be deduplicated.
+        
+        Args:
+            country: The country to get articles for
+            since: datePublishedUnix of the newest article already held
+            limit: The maximum number of (newest) articles to return
+            
+        Returns:
+            A list of articles, sorted by date (newest first), or None if ordered
+            queries aren't available for the country
+        """
+        logger.info(f"Retrieving articles for country {country} published since {since}")
+        try:
+            articles = await self.query_articles_by_published(country, limit, start_at=since)
+            if articles is not None:
+                logger.info(f"Retrieved {len(articles)} articles for {country} published since {since}")
+            return articles
+        except ReadBudgetExceeded:
+            raise
+        except Exception as e:
+            logger.error(f"Error retrieving articles for country {country} published since {since}: {e}")
+            raise Exception(f"Error retrieving articles for country {country} published since {since}: {e}")
+    
+    @track_method
+    async def get_articles_page(self, country: str, limit: int,
+                                before: Optional[Tuple[int, str]] = None) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Get one page of a country's article history, newest first
+        
+        Pages are keyed on (datePublishedUnix, id): each page is a bounded endAt /
+        limitToLast range read, so paging back costs one page of reads per page.
+        Articles sharing the cursor's timestamp are skipped by id, widening the read
+        if many of them share it. Falls back to a full download when ordered queries
+        aren't available for the country.
+        
+        Args:
+            country: The country to get articles for
+            limit: The page size
+            before: Cursor; only articles ordered before this (datePublishedUnix, id) are returned
+            
+        Returns:
+            The page of articles and whether older articles remain
+        """
+        logger.info(f"Retrieving page of {limit} articles for country {country} before {before}")
+        try:
+            request_size = limit + 1
+            while True:
+                queried = await self.query_articles_by_published(country, request_size, before[0] if before else None)
+                if queried is None:
+                    break
+                older = [article for article in queried if before is None or article_sort_key(article) < before]
+                # Either the page is full, or the range read came back short and there is nothing older
+                if len(older) > limit or len(queried) < request_size:
+                    return older[:limit], len(older) > limit
+                request_size *= 2
+            
+            logger.warning(f"Ordered queries unavailable for {country}, paging through a full download")
+            country_articles = await self.get_articles_by_country(country)
+            all_articles = sort_articles_newest_first(flatten_country_articles(country_articles or {}))
+            older = [article for article in all_articles if before is None or article_sort_key(article) < before]
+            return older[:limit], len(older) > limit
+        except ReadBudgetExceeded:
+            raise
+        except Exception as e:
+            logger.error(f"Error getting page of articles for country {country}: {e}")
+            raise Exception(f"Error getting page of articles for country {country}: {e}")
+    
+    @track_method
+    async def get_recent_articles_by_country(self, country: str, limit: int) -> List[Dict[str, Any]]:
         """
         Get the most recent articles for a specific country
         
+        Uses the ingestion-maintained article index when it can answer the request,
+        then a server-side ordered query, and falls back to downloading the whole
+        country otherwise.
+        
         Args:
             country: The country to get articles for
             limit: The maximum number of articles to return
@@ -88,52 +671,22 @@ class FirebaseClient:
         """
         logger.info(f"Retrieving up to {limit} recent articles for country: {country}")
         try:
+            indexed_articles = await self.get_indexed_recent_articles(country, limit)
+            if indexed_articles is not None:
+                return indexed_articles
+            
+            queried_articles = await self.query_articles_by_published(country, limit)
+            if queried_articles is not None:
+                return queried_articles
+            
             # Get all articles for the country
-            country_articles = self.get_articles_by_country(country)
+            country_articles = await self.get_articles_by_country(country)
             if not country_articles:
                 logger.info(f"No articles found for country: {country}, returning empty list")
                 return []
             
-            # Process the data structure to extract articles
-            all_articles = []
-            
-            # Iterate through dates
-            for date_str, date_data in country_articles.items():
-                # Check if date_data is a dictionary before iterating
-                if not isinstance(date_data, dict):
-                    continue
-                    
-                # Iterate through articles for this date
-                for article_id, article_data in date_data.items():
-                    # Make sure we have valid article data
-                    if not isinstance(article_data, dict):
-                        continue
-                        
-                    # Create a new article object with the necessary data
-                    article = {}
-                    
-                    # Copy the metadata, content, factCheck, and media if they exist
-                    if "metadata" in article_data:
-                        article["metadata"] = article_data["metadata"]
-                    if "content" in article_data:
-                        article["content"] = article_data["content"]
-                    if "factCheck" in article_data:
-                        article["factCheck"] = article_data["factCheck"]
-                    if "media" in article_data:
-                        article["media"] = article_data["media"]
-                    
-                    # Add date and id to the article data
-                    article["date"] = date_str
-                    article["id"] = article_id
-                    
-                    all_articles.append(article)
-            
-            # Sort articles by date (newest first)
-            # Using the datePublishedUnix field from metadata for accurate sorting
-            all_articles.sort(
-                key=lambda x: int(x.get("metadata", {}).get("datePublishedUnix", 0) or 0), 
-                reverse=True
-            )
+            # Flatten the date buckets and sort newest first
+            all_articles = sort_articles_newest_first(flatten_country_articles(country_articles))
             
             # Log the date range of articles found
             if all_articles:
@@ -147,6 +700,8 @@ class FirebaseClient:
             # Return only the requested number of articles
             return all_articles[:limit]
             
+        except ReadBudgetExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error getting recent articles for country {country}: {e}")
             raise Exception(f"Error getting recent articles for country {country}: {e}")
@@ -0,0 +1,48 @@
+import logging
+from typing import Dict, Hashable, List, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class FrequencyCounter:
+    """
+    Recent request frequency per key, with TinyLFU-style aging
+
+    Every `sample_size` recorded requests all counts are halved, so popularity
+    decays and a key that was hot an hour ago doesn't outrank one that is hot now.
+    There are only a couple of hundred countries, so counts are kept exactly
+    instead of in a count-min sketch.
+    """
+
+    def __init__(self, sample_size: int = 1000):
+        """
+        Initialize the counter
+
+        Args:
+            sample_size: Number of recorded requests between halvings
+        """
+        self.sample_size = sample_size
+        self.counts: Dict[Hashable, float] = {}
+        self.recorded = 0
+
+    def record(self, key: Hashable) -> None:
+        """Count one request for a key"""
+        self.counts[key] = self.counts.get(key, 0) + 1
+        self.recorded += 1
+        if self.recorded >= self.sample_size:
+            self._age()
+
+    def estimate(self, key: Hashable) -> float:
+        """Get the decayed request count of a key"""
+        return self.counts.get(key, 0)
+
+    def top(self, n: int) -> List[Tuple[Hashable, float]]:
+        """Get the n most requested keys with their counts, most requested first"""
+        return sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:n]
+
+    def _age(self) -> None:
+        """Halve every count, dropping keys that fall below one request"""
+        self.counts = {key: count / 2 for key, count in self.counts.items() if count / 2 >= 0.5}
+        self.recorded = 0
+        logger.info(f"Aged request frequencies, {len(self.counts)} keys remain")
@@ -0,0 +1,137 @@
+import atexit
+import contextvars
+import logging
+import logging.handlers
+import queue
+import random
+from typing import Any, Callable, Dict, Optional
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Sampling state of the request being handled: {"scope": ASGI scope, "sampled": bool or None}
+_request_log_state: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar(
+    "request_log_state", default=None
+)
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """
+    Parse per-route log sampling rates
+
+    Args:
+        spec: Comma-separated route=rate pairs, e.g. "/articles/{country}=0.1,/articles=0.2"
+
+    Returns:
+        Mapping of route path template to the fraction of its requests that log INFO/DEBUG lines
+    """
+    rates = {}
+    for item in spec.split(","):
+        route, separator, rate = item.strip().rpartition("=")
+        if separator and route:
+            rates[route] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+class RequestSampler(logging.Filter):
+    """
+    Drop the INFO and DEBUG lines of requests that weren't sampled
+
+    The decision is made once per request, the first time it logs, from the rate
+    of its route (the path template, e.g. "/articles/{country}"), so a sampled
+    request keeps all of its lines. Warnings and errors, and anything logged
+    outside a request, always pass.
+    """
+
+    def __init__(self, rates: Dict[str, float], default_rate: float = 1.0):
+        super().__init__()
+        self.rates = rates
+        self.default_rate = default_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        state = _request_log_state.get()
+        if state is None:
+            return True
+        if state["sampled"] is None:
+            route = state["scope"].get("route")
+            path = getattr(route, "path", None) or state["scope"].get("path", "")
+            state["sampled"] = random.random() < self.rates.get(path, self.default_rate)
+        return state["sampled"]
+
+
+class RequestLogContext:
+    """ASGI middleware giving each HTTP request its own log sampling state"""
+
+    def __init__(self, app: Callable):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _request_log_state.set({"scope": scope, "sampled": None})
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_log_state.reset(token)
+
+
+class LazyField:
+    """
+    A log argument computed only if the line is actually emitted
+
+    Use with %-style arguments: logger.debug("Range: %s", LazyField(lambda: expensive()))
+    """
+
+    def __init__(self, compute: Callable[[], Any]):
+        self.compute = compute
+
+    def __str__(self) -> str:
+        return str(self.compute())
+
+
+def setup_logging(log_file: str, level: str = "INFO", sample_rates: Optional[Dict[str, float]] = None,
+                  default_sample_rate: float = 1.0) -> logging.handlers.QueueListener:
+    """
+    Route all logging through a queue to a background writer thread
+
+    Request threads only format the record and put it on the queue; the console
+    and log file are written by the QueueListener thread.
+
+    Args:
+        log_file: Path of the log file (appended to)
+        level: Root log level name
+        sample_rates: Per-route sampling rates for INFO and DEBUG lines
+        default_sample_rate: Sampling rate of routes without their own rate
+
+    Returns:
+        The started listener; stop it on shutdown to flush pending lines
+    """
+    formatter = logging.Formatter(LOG_FORMAT)
+    console_handler = logging.StreamHandler()  # Log to console
+    file_handler = logging.FileHandler(log_file, mode='a')  # Log to file
+    for handler in (console_handler, file_handler):
+        handler.setFormatter(formatter)
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(RequestSampler(sample_rates or {}, default_sample_rate))
+
+    root = logging.getLogger()
+    root.setLevel(level.upper())
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+
+    listener = logging.handlers.QueueListener(log_queue, console_handler, file_handler, respect_handler_level=True)
+    listener.start()
+    # Flush whatever is still queued if the process exits without a clean shutdown
+    atexit.register(stop_logging, listener)
+    return listener
+
+
+def stop_logging(listener: logging.handlers.QueueListener) -> None:
+    """Write out the queued log lines and stop the writer thread (safe to call twice)"""
+    if getattr(listener, "_thread", None) is not None:
+        listener.stop()
@@ -1,40 +1,76 @@
-from fastapi import FastAPI, HTTPException, Query, Body, Depends
+from fastapi import FastAPI, HTTPException, Query, Body, Depends, Request, Header
+from fastapi.responses import StreamingResponse, Response, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Dict, Any, List, Optional, Set
+from typing import Dict, Any, List, Optional, Set, Tuple
+from contextlib import asynccontextmanager
+import asyncio
+import zlib
 import os
+import time
 import uvicorn
 import logging
 from pydantic import BaseModel
 
-from app.firebase_client import FirebaseClient
-from app.cache import ArticleCache
+from app.firebase_client import AsyncFirebaseClient
+from app.fake_rtdb import FakeRealtimeDatabase
+from app.cache import ArticleCache, CACHE_POLICIES
+from app.cache_store import JSONCacheStore, SQLiteCacheStore
+from app.singleflight import SingleFlight
+from app.refresher import CacheRefresher
+from app.logging_setup import setup_logging, stop_logging, parse_sample_rates, RequestLogContext, LazyField
+from app.metrics import REGISTRY, CONTENT_TYPE, REFRESH_DURATION, MetricsMiddleware, register_cache
+from app.server_timing import ServerTimingMiddleware, span, current_timings
+from app.profiling import ProfilingMiddleware, StackSampler, token_matches
+from app.read_budget import ReadBudget, ReadBudgetExceeded, ClientContext, current_client, unattributed
+from app.firebase_client import ARTICLE_INDEX_SIZE, article_sort_key
+from app.views import VIEWS, summarize_article, parse_fields, project_article, encode_cursor, parse_cursor
+from app.responses import articles_envelope, prepared_response, json_response, cache_headers, encode_json
 
 # Create logs directory if it doesn't exist
 logs_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "logs")
 os.makedirs(logs_dir, exist_ok=True)
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),  # Log to console
-        logging.FileHandler(os.path.join(logs_dir, "app.log"), mode='a'),  # Log to file
-    ]
-)
+# Configure logging: lines are written to the console and logs/app.log by a background
+# thread, and only a sample of the INFO/DEBUG lines of hot routes are kept
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_SAMPLE_RATES = parse_sample_rates(os.getenv("LOG_SAMPLE_RATES", "/articles/{country}=0.1,/articles=0.1"))
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+log_listener = setup_logging(os.path.join(logs_dir, "app.log"), LOG_LEVEL, LOG_SAMPLE_RATES, LOG_SAMPLE_RATE)
 logger = logging.getLogger(__name__)
 
 # Define models for request/response
 class RefreshCacheRequest(BaseModel):
     countries: List[str]
+    full: bool = False
+
+class CacheDepthRequest(BaseModel):
+    depths: Dict[str, int]
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run the background cache refresher, and release the Firebase connection pool on shutdown"""
+    if BACKGROUND_REFRESH:
+        cache_refresher.start()
+    yield
+    await cache_refresher.stop()
+    await asyncio.to_thread(stack_sampler.stop)
+    await firebase_client.close()
+    cache_store.close()
+    stop_logging(log_listener)
 
 # Initialize FastAPI app
 app = FastAPI(
     title="_map_backend",
     description="API for accessing articles from a Firebase Realtime Database with caching",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
+@app.exception_handler(ReadBudgetExceeded)
+async def read_budget_exceeded_handler(request: Request, exc: ReadBudgetExceeded) -> JSONResponse:
+    """Answer reads refused by the read budget with 429 and when to retry"""
+    return JSONResponse({"detail": str(exc)}, status_code=429, headers={"Retry-After": str(exc.retry_after)})
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -44,31 +80,435 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
-# Define cache file path
-CACHE_FILE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "article_cache.json")
+# Per-request log sampling state
+app.add_middleware(RequestLogContext)
+
+# Server-Timing header with the cache/firebase/process/serialize breakdown of each response
+app.add_middleware(ServerTimingMiddleware)
+
+# Request latency histograms, exposed on /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Firebase reads made for a request are charged to its client address
+app.add_middleware(ClientContext)
+
+# Admin endpoints (/admin/...) require ADMIN_TOKEN in the X-Admin-Token header and are
+# disabled when it is unset. PROFILE_SAMPLE_RATE of requests, and requests sending the
+# token in X-Profile, are profiled with cProfile into the logs directory.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN") or None
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+app.add_middleware(ProfilingMiddleware, output_dir=logs_dir, sample_rate=PROFILE_SAMPLE_RATE, admin_token=ADMIN_TOKEN)
+stack_sampler = StackSampler(logs_dir)
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None)) -> None:
+    """Reject requests without the admin token"""
+    if ADMIN_TOKEN is None:
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled (ADMIN_TOKEN is not set)")
+    if not token_matches(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+# Define cache file paths: the cache is persisted to SQLite (one row per country) in
+# CACHE_DIR, importing the legacy JSON file on first start; CACHE_STORE=json keeps the JSON file
+CACHE_DIR = os.getenv("CACHE_DIR") or os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+CACHE_FILE_PATH = os.path.join(CACHE_DIR, "article_cache.json")
+CACHE_DB_PATH = os.path.join(CACHE_DIR, "article_cache.db")
+CACHE_STORE = os.getenv("CACHE_STORE", "sqlite").lower()
 
 # Create data directory if it doesn't exist
-os.makedirs(os.path.dirname(CACHE_FILE_PATH), exist_ok=True)
+os.makedirs(CACHE_DIR, exist_ok=True)
+
+# Number of articles kept in the cache per country, unless set per country
+# through /set-cache-depths (e.g. 100 for hot countries). Capped at the largest
+# limit /articles/{country} accepts.
+MAX_ARTICLE_LIMIT = 100
+DEFAULT_CACHE_DEPTH = min(int(os.getenv("DEFAULT_CACHE_DEPTH", "10")), MAX_ARTICLE_LIMIT)
+
+# Cache misses for whitelisted countries populate the cache; empty countries are
+# remembered for NEGATIVE_CACHE_TTL seconds
+CACHE_READ_THROUGH = os.getenv("CACHE_READ_THROUGH", "true").lower() == "true"
+NEGATIVE_CACHE_TTL = float(os.getenv("NEGATIVE_CACHE_TTL", "300"))
+
+# Which countries are cached (see CACHE_POLICIES) and the memory budget beyond which
+# non-whitelisted countries are evicted (0 for unbounded)
+CACHE_POLICY = os.getenv("CACHE_POLICY", "whitelist").lower()
+if CACHE_POLICY not in CACHE_POLICIES:
+    raise ValueError(f"CACHE_POLICY must be one of {CACHE_POLICIES}, got {CACHE_POLICY!r}")
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", "0"))
+
+# Up to AUTO_WHITELIST_SIZE of the most requested countries are whitelisted on top of
+# the manual whitelist, once requested AUTO_WHITELIST_MIN_REQUESTS times (decaying)
+AUTO_WHITELIST_SIZE = int(os.getenv("AUTO_WHITELIST_SIZE", "0"))
+AUTO_WHITELIST_MIN_REQUESTS = float(os.getenv("AUTO_WHITELIST_MIN_REQUESTS", "5"))
+
+# Point the backend at a local fake database (a JSON export) to run it offline
+FIREBASE_FAKE_DATA = os.getenv("FIREBASE_FAKE_DATA")
+DATABASE_RULES_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "database.rules.json")
+
+# Firebase read budget over a rolling READ_BUDGET_WINDOW: up to READ_BUDGET_BYTES downloaded
+# and READ_BUDGET_CALLS reads (0 for no limit). From READ_BUDGET_DEGRADE_AT of a limit, deep
+# reads are cut down to the cache depth and whole-database endpoints return 429. Each client
+# may download CLIENT_READ_RATE bytes per second, in bursts of up to CLIENT_READ_BURST.
+READ_BUDGET_WINDOW = float(os.getenv("READ_BUDGET_WINDOW", "3600"))
+READ_BUDGET_BYTES = int(os.getenv("READ_BUDGET_BYTES", "0"))
+READ_BUDGET_CALLS = int(os.getenv("READ_BUDGET_CALLS", "0"))
+READ_BUDGET_DEGRADE_AT = float(os.getenv("READ_BUDGET_DEGRADE_AT", "0.8"))
+CLIENT_READ_RATE = float(os.getenv("CLIENT_READ_RATE", "0"))
+CLIENT_READ_BURST = float(os.getenv("CLIENT_READ_BURST", "0"))
+read_budget = ReadBudget(
+    window=READ_BUDGET_WINDOW,
+    max_bytes=READ_BUDGET_BYTES,
+    max_calls=READ_BUDGET_CALLS,
+    degrade_at=READ_BUDGET_DEGRADE_AT,
+    client_rate=CLIENT_READ_RATE,
+    client_burst=CLIENT_READ_BURST
+)
 
 # Initialize Firebase client and cache
-firebase_client = FirebaseClient()
-article_cache = ArticleCache(CACHE_FILE_PATH)
+if FIREBASE_FAKE_DATA:
+    logger.warning(f"Using fake Realtime Database loaded from {FIREBASE_FAKE_DATA}")
+    fake_database = FakeRealtimeDatabase.from_files(FIREBASE_FAKE_DATA, DATABASE_RULES_PATH)
+    firebase_client = AsyncFirebaseClient(database_url="http://fake-rtdb", transport=fake_database.transport(),
+                                          budget=read_budget)
+else:
+    firebase_client = AsyncFirebaseClient(budget=read_budget)
+if CACHE_STORE == "json":
+    cache_store = JSONCacheStore(CACHE_FILE_PATH)
+else:
+    cache_store = SQLiteCacheStore(CACHE_DB_PATH, legacy_json_path=CACHE_FILE_PATH)
+article_cache = ArticleCache(
+    cache_store,
+    read_through=CACHE_READ_THROUGH,
+    negative_ttl=NEGATIVE_CACHE_TTL,
+    default_depth=DEFAULT_CACHE_DEPTH,
+    policy=CACHE_POLICY,
+    max_bytes=CACHE_MAX_BYTES,
+    auto_whitelist_size=AUTO_WHITELIST_SIZE,
+    auto_whitelist_min_requests=AUTO_WHITELIST_MIN_REQUESTS
+)
+register_cache(article_cache)
 
 # Set default whitelisted countries if not already set
 if not article_cache.get_whitelisted_countries():
     default_countries = ["USA", "UK", "CANADA", "AUSTRALIA", "INDIA"]
     article_cache.set_whitelisted_countries(default_countries)
 
+# Batch requests fetch at most BATCH_CONCURRENCY cache misses from Firebase at a time
+MAX_BATCH_COUNTRIES = 50
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "5"))
+
+# Cached responses may be reused by browsers and proxies for HTTP_CACHE_MAX_AGE seconds,
+# but never past the point where the cache itself is due for its 12-hourly refresh
+CACHE_REFRESH_INTERVAL = float(os.getenv("CACHE_REFRESH_INTERVAL", str(12 * 60 * 60)))
+HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", "300"))
+
+# Whitelisted countries are refreshed in the background every CACHE_REFRESH_INTERVAL
+# seconds, brought forward by up to CACHE_REFRESH_JITTER of the interval
+BACKGROUND_REFRESH = os.getenv("BACKGROUND_REFRESH", "true").lower() == "true"
+CACHE_REFRESH_JITTER = float(os.getenv("CACHE_REFRESH_JITTER", "0.1"))
+CACHE_REFRESH_CHECK_INTERVAL = float(os.getenv("CACHE_REFRESH_CHECK_INTERVAL", "60"))
+
+# /refresh-cache and the background refresher each fetch at most REFRESH_CONCURRENCY countries from Firebase at a time
+REFRESH_CONCURRENCY = int(os.getenv("REFRESH_CONCURRENCY", "5"))
+
+def _admit_read(expensive: bool = False) -> None:
+    """
+    Refuse a Firebase read the read budget can't afford (answered with a 429)
+    
+    Args:
+        expensive: Whether the read may download a large part of the database
+        
+    Raises:
+        ReadBudgetExceeded: If the read would overspend the budget
+    """
+    read_budget.check(current_client(), expensive)
+
+async def admit_read() -> None:
+    """Dependency of endpoints that always read from Firebase"""
+    _admit_read()
+
+async def admit_expensive_read() -> None:
+    """Dependency of endpoints that may download a large part of the database"""
+    _admit_read(expensive=True)
+
+def _http_cache_headers(country: str, source: str) -> Dict[str, str]:
+    """Cache-Control / Last-Modified headers for an article response"""
+    last_refresh = article_cache.get_last_refresh_time(country) if source == "cache" else None
+    if last_refresh is None:
+        return cache_headers(None, 0)
+    remaining = CACHE_REFRESH_INTERVAL - (time.time() - last_refresh)
+    return cache_headers(last_refresh, min(HTTP_CACHE_MAX_AGE, remaining))
+
+# Firebase reads are coalesced per (country, limit bucket): a request for 7 articles
+# shares the fetch of a concurrent request for 10. The article index size is a bucket
+# too, so limits the index can answer aren't rounded past it
+LIMIT_BUCKETS = tuple(sorted({10, ARTICLE_INDEX_SIZE, 25, 50, 100}))
+firebase_fetches = SingleFlight()
+
+def _limit_bucket(limit: int) -> int:
+    """Round a limit up to the nearest fetch bucket"""
+    for bucket in LIMIT_BUCKETS:
+        if limit <= bucket:
+            return bucket
+    return limit
+
+async def _fetch_recent_articles(country: str, limit: int) -> List[Dict[str, Any]]:
+    """
+    Fetch the most recent articles for a country from Firebase
+    
+    Concurrent callers asking for the same country and limit bucket share a single
+    Firebase read instead of each downloading the country subtree.
+    """
+    bucket = _limit_bucket(limit)
+    articles = await firebase_fetches.do(
+        (country, bucket),
+        lambda: firebase_client.get_recent_articles_by_country(country, bucket)
+    )
+    return articles[:limit]
+
+async def _fetch_refresh_articles(country: str, full: bool = False) -> Tuple[Optional[List[Dict[str, Any]]], Any]:
+    """
+    Fetch the articles a country's cache entry should be refreshed with
+    
+    Overlapping refreshes of the same country (background and /refresh-cache)
+    share one version read and one article read.
+    
+    Returns:
+        The articles (None if the cached ones are unchanged) and the version stamp
+        read before fetching them
+    """
+    return await firebase_fetches.do(
+        (country, "refresh", full),
+        lambda: _read_refresh_articles(country, full)
+    )
+
+async def _read_refresh_articles(country: str, full: bool) -> Tuple[Optional[List[Dict[str, Any]]], Any]:
+    """
+    Read the articles a country's cache entry should be refreshed with from Firebase
+    
+    The country's articleVersion stamp is read first: if it matches the stamp its
+    cached articles were loaded at, nothing else is read. Otherwise a cached
+    country only fetches the articles published since its newest cached one and
+    merges them in; uncached countries (or full=True, or when ordered queries
+    aren't available) fetch as many articles as their cache depth.
+    
+    Returns:
+        The articles (None if the cached ones are unchanged) and the version stamp
+        read before fetching them
+    """
+    # Read the version before the articles, so a write in between is caught next time
+    version = await firebase_client.get_article_version(country)
+    if not full and version is not None and version == article_cache.get_article_version(country):
+        logger.info(f"Article version for {country} is unchanged, skipping fetch")
+        return None, version
+    
+    depth = article_cache.get_cache_depth(country)
+    newest = None if full else article_cache.get_newest_published(country)
+    if newest is not None:
+        newer = await firebase_client.get_articles_newer_than(country, newest, depth)
+        if newer is not None:
+            logger.info(f"Delta refresh for {country}: {len(newer)} articles published since {newest}")
+            return article_cache.merged_articles(country, newer)[:depth], version
+    return await _fetch_recent_articles(country, limit=depth), version
+
+async def _refresh_country(country: str) -> Optional[int]:
+    """
+    Refetch a whitelisted country's articles into the cache
+    
+    Returns:
+        The number of articles cached, or None if they were unchanged
+    """
+    start = time.perf_counter()
+    try:
+        # Refreshes serve every client, so they aren't charged to the request that scheduled them
+        with unattributed():
+            articles, version = await _fetch_refresh_articles(country)
+        if articles is None:
+            article_cache.mark_refreshed(country)
+            return None
+        article_cache.set_articles(country, articles, version)
+        return len(articles)
+    finally:
+        REFRESH_DURATION.observe(time.perf_counter() - start, ("background",))
+
+cache_refresher = CacheRefresher(
+    article_cache,
+    _refresh_country,
+    interval=CACHE_REFRESH_INTERVAL,
+    jitter=CACHE_REFRESH_JITTER,
+    check_interval=CACHE_REFRESH_CHECK_INTERVAL,
+    concurrency=REFRESH_CONCURRENCY
+)
+
+async def _load_articles(country: str, limit: int, view: str,
+                         fetch_slots: Optional[asyncio.Semaphore] = None) -> Tuple[List[Dict[str, Any]], str, Optional[str]]:
+    """
+    Get a country's most recent articles from the cache, or from Firebase on a miss
+    
+    Args:
+        country: Country code (uppercase)
+        limit: Maximum number of articles to return
+        view: "full" or "summary"
+        fetch_slots: Optional semaphore bounding concurrent Firebase fetches (cache hits don't wait on it)
+        
+    Returns:
+        The articles, where they came from ("cache", "firebase", or "degraded" when
+        cut down to the cache depth because the read budget is nearly spent) and
+        the cursor of the next page (None when there are no older articles)
+    """
+    # Any limit up to the country's cache depth can be served from memory
+    depth = article_cache.get_cache_depth(country)
+    degraded = limit > depth and read_budget.is_tight()
+    if degraded:
+        logger.info("Read budget nearly spent - Limiting %s to its cache depth of %d articles", country, depth)
+        limit = depth
+    with span("cache"):
+        cached_articles = article_cache.get_articles(country, limit, view=view)
+    
+    if cached_articles is not None:
+        logger.info("Cache HIT for %s - Returning %d articles from cache", country, min(len(cached_articles), limit))
+        cache_refresher.revalidate_if_stale(country)
+        # Return the cached articles, limited to the requested number
+        articles = cached_articles[:limit]
+        logger.debug("Cache HIT for %s - article ids: %s", country, LazyField(lambda: [article.get("id") for article in articles]))
+        next_cursor = encode_cursor(articles[-1]) if articles and article_cache.has_more_after(country, limit) else None
+        return articles, "degraded" if degraded else "cache", next_cursor
+    
+    _admit_read()
+    if limit > depth:
+        logger.info(f"Limit {limit} > cache depth {depth} for {country}, fetching directly from Firebase")
+    else:
+        logger.info(f"Cache MISS for {country} - Fetching from Firebase")
+    # Fetch at least a full cache page so the result can populate the cache
+    fetch_size = max(limit, depth)
+    if fetch_slots is not None:
+        async with fetch_slots:
+            fetched = await _fetch_recent_articles(country, fetch_size)
+    else:
+        fetched = await _fetch_recent_articles(country, fetch_size)
+    logger.info(f"Retrieved {len(fetched)} articles for {country} from Firebase")
+    article_cache.store_fetched_articles(country, fetched)
+    articles = fetched[:limit]
+    # A short fetch means the country has nothing older
+    has_more = len(fetched) > limit or len(fetched) >= fetch_size
+    next_cursor = encode_cursor(articles[-1]) if articles and has_more else None
+    if view == "summary":
+        articles = [summarize_article(article) for article in articles]
+    return articles, "degraded" if degraded else "firebase", next_cursor
+
+async def _load_articles_page(country: str, limit: int, view: str,
+                              before: Tuple[int, str]) -> Tuple[List[Dict[str, Any]], str, Optional[str]]:
+    """
+    Get the page of a country's articles ordered just before a cursor
+    
+    Answered from the cache when the cached list reaches past the page, otherwise
+    with a bounded range read from Firebase.
+    
+    Args:
+        country: Country code (uppercase)
+        limit: Page size
+        view: "full" or "summary"
+        before: (datePublishedUnix, id) the page starts after
+        
+    Returns:
+        The page, where it came from ("cache" or "firebase") and the next cursor
+    """
+    with span("cache"):
+        cached_articles = article_cache.get_articles(country)
+    if cached_articles is not None:
+        older = [article for article in cached_articles if article_sort_key(article) < before]
+        if len(older) > limit or article_cache.is_complete(country):
+            logger.info(f"Cache HIT for {country} page before {before}")
+            page, has_more = older[:limit], len(older) > limit
+            source = "cache"
+        else:
+            cached_articles = None
+    if cached_articles is None:
+        _admit_read()
+        page, has_more = await firebase_fetches.do(
+            (country, "page", before, limit),
+            lambda: firebase_client.get_articles_page(country, limit, before)
+        )
+        source = "firebase"
+    
+    next_cursor = encode_cursor(page[-1]) if page and has_more else None
+    if view == "summary":
+        page = [summarize_article(article) for article in page]
+    return page, source, next_cursor
+
 @app.get("/")
 async def root():
     """Root endpoint to check if the API is running"""
     logger.info("Root endpoint accessed")
     return {"message": "Welcome to the _map_backend API"}
 
+@app.get("/articles")
+async def get_recent_articles_batch(
+    request: Request,
+    countries: str = Query(..., description="Comma-separated country codes, e.g. USA,UK,INDIA"),
+    limit: int = Query(default=10, ge=1, le=MAX_ARTICLE_LIMIT, description="Maximum number of articles to return per country"),
+    view: str = Query(default="full", pattern=f"^({'|'.join(VIEWS)})$", description="Article representation: full or summary"),
+    fields: Optional[str] = Query(default=None, description="Comma-separated dotted fields to return, e.g. metadata.title,metadata.url")
+):
+    """
+    Get the most recent articles for several countries at once
+    
+    Cached countries are answered from memory; misses are fetched from Firebase
+    concurrently, at most BATCH_CONCURRENCY at a time. A failing country is
+    reported in its own result instead of failing the whole request.
+    
+    Parameters:
+    - countries: Comma-separated country codes (at most 50)
+    - limit, view, fields: As for /articles/{country}
+    
+    Returns:
+    - A result per country with its status, source and articles
+    """
+    requested = list(dict.fromkeys(c.strip().upper() for c in countries.split(",") if c.strip()))
+    if not requested:
+        raise HTTPException(status_code=400, detail="No countries requested")
+    if len(requested) > MAX_BATCH_COUNTRIES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_COUNTRIES} countries can be requested at once")
+    
+    logger.info("GET /articles - Request received for %d countries: %s, limit=%d, view=%s", len(requested), requested, limit, view)
+    projection = parse_fields(fields)
+    fetch_slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+    
+    async def load(country: str) -> Dict[str, Any]:
+        article_cache.record_request(country)
+        try:
+            articles, source, next_cursor = await _load_articles(country, limit, view, fetch_slots)
+            if projection:
+                articles = [project_article(article, projection) for article in articles]
+            return {"status": "success", "source": source, "count": len(articles), "articles": articles,
+                    "next_cursor": next_cursor}
+        except ReadBudgetExceeded as e:
+            return {"status": "error", "message": str(e), "retry_after": e.retry_after}
+        except Exception as e:
+            logger.error(f"GET /articles - Error getting articles for {country}: {e}")
+            return {"status": "error", "message": str(e)}
+    
+    loaded = await asyncio.gather(*[load(country) for country in requested])
+    results = dict(zip(requested, loaded))
+    
+    error_count = sum(1 for result in loaded if result["status"] == "error")
+    logger.info("GET /articles - Completed: %d countries successful, %d failed", len(requested) - error_count, error_count)
+    
+    response = {
+        "limit": limit,
+        "view": view,
+        "results": results
+    }
+    return json_response(response, request.headers.get("if-none-match"), cache_headers(None, 0))
+
 @app.get("/articles/{country}")
 async def get_recent_articles(
+    request: Request,
     country: str,
-    limit: int = Query(default=10, ge=1, le=100, description="Maximum number of articles to return")
+    limit: int = Query(default=10, ge=1, le=MAX_ARTICLE_LIMIT, description="Maximum number of articles to return"),
+    view: str = Query(default="full", pattern=f"^({'|'.join(VIEWS)})$", description="Article representation: full or summary"),
+    fields: Optional[str] = Query(default=None, description="Comma-separated dotted fields to return, e.g. metadata.title,metadata.url"),
+    before: Optional[str] = Query(default=None, description="Pagination cursor (<datePublishedUnix>,<id>) from a previous next_cursor"),
+    debug: bool = Query(default=False, description="Include the per-phase timing breakdown in the response")
 ):
     """
     Get the most recent articles for a specific country
@@ -76,50 +516,63 @@ async def get_recent_articles(
     Parameters:
     - country: The country code (e.g., 'USA')
     - limit: Maximum number of articles to return (default: 10, min: 1, max: 100)
+    - view: "full" (default) or "summary" (title, source, date, URL and the first 250 characters of the text)
+    - fields: Optional comma-separated dotted fields to keep from each article (the id is always kept)
+    - before: Optional cursor; returns the page of articles older than it
+    - debug: Add a "timing" field with the per-phase breakdown also sent in the
+      Server-Timing header (bypasses the pre-serialized bodies)
     
     Returns:
-    - A list of the most recent articles for the specified country
+    - A list of the most recent articles for the specified country, and the
+      next_cursor to pass as `before` for the following page (null on the last page)
     """
     try:
         # Convert country to uppercase to ensure consistent formatting
         country = country.upper()
         
-        # Log all query parameters
-        logger.info(f"GET /articles/{country} - Request received with parameters: limit={limit}")
+        # Log all query parameters (formatted only if this request is sampled)
+        logger.info("GET /articles/%s - Request received with parameters: limit=%d, view=%s, fields=%s", country, limit, view, fields)
+        
+        projection = parse_fields(fields)
+        article_cache.record_request(country)
+        
+        cursor = None
+        if before is not None:
+            try:
+                cursor = parse_cursor(before)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
         
-        # If limit is greater than 10, always use Firebase directly
-        if limit > 10:
-            logger.info(f"GET /articles/{country} - Limit > 10, bypassing cache and fetching directly from Firebase")
-            articles = firebase_client.get_recent_articles_by_country(country, limit)
-            logger.info(f"GET /articles/{country} - Retrieved {len(articles)} articles from Firebase")
-            source = "firebase"
+        # Common requests for cached countries are answered with bytes serialized at refresh time
+        if not projection and cursor is None and not debug:
+            with span("cache"):
+                prepared = article_cache.get_prepared_body(country, limit, view)
+            if prepared is not None:
+                cache_refresher.revalidate_if_stale(country)
+                return prepared_response(
+                    prepared,
+                    request.headers.get("accept-encoding"),
+                    request.headers.get("if-none-match"),
+                    _http_cache_headers(country, "cache")
+                )
+        
+        if cursor is not None:
+            articles, source, next_cursor = await _load_articles_page(country, limit, view, cursor)
         else:
-            # Check if country is in cache
-            cached_articles = article_cache.get_articles(country)
-            
-            if cached_articles is not None:
-                logger.info(f"GET /articles/{country} - Cache HIT - Returning {min(len(cached_articles), limit)} articles from cache")
-                # Return the cached articles, limited to the requested number
-                articles = cached_articles[:limit]
-                source = "cache"
-            else:
-                logger.info(f"GET /articles/{country} - Cache MISS - Fetching from Firebase")
-                # Fetch from Firebase if not in cache
-                articles = firebase_client.get_recent_articles_by_country(country, limit)
-                logger.info(f"GET /articles/{country} - Retrieved {len(articles)} articles from Firebase")
-                source = "firebase"
+            articles, source, next_cursor = await _load_articles(country, limit, view)
+        
+        if projection:
+            articles = [project_article(article, projection) for article in articles]
         
         # Return the articles along with metadata
-        response = {
-            "country": country,
-            "count": len(articles),
-            "limit": limit,
-            "source": source,
-            "articles": articles
-        }
+        response = articles_envelope(country, articles, limit, view, source, next_cursor)
+        if debug:
+            response["timing"] = current_timings()
         
-        logger.info(f"GET /articles/{country} - Returning {len(articles)} articles from {source}")
-        return response
+        logger.info("GET /articles/%s - Returning %d articles from %s", country, len(articles), source)
+        return json_response(response, request.headers.get("if-none-match"), _http_cache_headers(country, source))
+    except (HTTPException, ReadBudgetExceeded):
+        raise
     except Exception as e:
         logger.error(f"Error getting articles for {country}: {e}")
         # Handle errors
@@ -130,11 +583,14 @@ async def refresh_cache(request: RefreshCacheRequest):
     """
     Refresh the cache for specified countries
     
-    This endpoint should be called:
-    - Every 12 hours by a scheduled task
-    - Manually after updating the Firebase database
+    Whitelisted countries are also refreshed in the background every
+    CACHE_REFRESH_INTERVAL seconds; call this endpoint after updating the
+    Firebase database to pick up the changes right away.
     
-    Only whitelisted countries will be cached.
+    Only whitelisted countries will be cached. Countries are fetched concurrently,
+    at most REFRESH_CONCURRENCY at a time, and the cache is saved once at the end.
+    Cached countries only fetch articles newer than their newest cached one; set
+    "full" to refetch them completely.
     """
     try:
         logger.info(f"POST /refresh-cache - Request received for countries: {request.countries}")
@@ -149,39 +605,64 @@ async def refresh_cache(request: RefreshCacheRequest):
         
         logger.info(f"POST /refresh-cache - Request includes {len(non_whitelisted)} non-whitelisted countries: {non_whitelisted}")
         
-        # Filter to only include whitelisted countries
+        # Filter to only include countries the cache policy admits
         countries_to_refresh = []
         for country in request.countries:
             country = country.upper()
-            if article_cache.is_country_whitelisted(country):
+            if article_cache.can_cache(country):
                 countries_to_refresh.append(country)
-                logger.info(f"POST /refresh-cache - Country {country} is whitelisted and will be refreshed")
+                logger.info(f"POST /refresh-cache - Country {country} can be cached and will be refreshed")
             else:
                 logger.warning(f"POST /refresh-cache - Country {country} is not whitelisted and will not be cached")
                 
         logger.info(f"POST /refresh-cache - Will refresh {len(countries_to_refresh)}/{requested_count} requested countries")
         
-        # Refresh cache for each country
+        # Fetch all countries concurrently, bounded by REFRESH_CONCURRENCY
+        refresh_slots = asyncio.Semaphore(REFRESH_CONCURRENCY)
+        
+        async def fetch_country(country: str) -> Tuple[Optional[List[Dict[str, Any]]], Any]:
+            async with refresh_slots:
+                start = time.perf_counter()
+                try:
+                    with unattributed():
+                        return await _fetch_refresh_articles(country, full=request.full)
+                finally:
+                    REFRESH_DURATION.observe(time.perf_counter() - start, ("endpoint",))
+        
+        fetched = await asyncio.gather(*[fetch_country(country) for country in countries_to_refresh],
+                                       return_exceptions=True)
+        
         results = {}
-        for country in countries_to_refresh:
-            try:
-                # Get only 10 articles for the country (to minimize Firebase reads)
-                articles = firebase_client.get_recent_articles_by_country(country, limit=10)
-                
-                # Update cache
-                article_cache.set_articles(country, articles)
-                
+        articles_by_country = {}
+        versions = {}
+        for country, outcome in zip(countries_to_refresh, fetched):
+            if isinstance(outcome, BaseException):
                 results[country] = {
-                    "status": "success",
-                    "article_count": len(articles)
+                    "status": "error",
+                    "message": str(outcome)
                 }
-                logger.info(f"Cache refreshed for {country} with {len(articles)} articles")
-            except Exception as e:
+                if isinstance(outcome, ReadBudgetExceeded):
+                    results[country]["retry_after"] = outcome.retry_after
+                logger.error(f"Error refreshing cache for {country}: {outcome}")
+                continue
+            
+            articles, version = outcome
+            if articles is None:
+                article_cache.mark_refreshed(country)
                 results[country] = {
-                    "status": "error",
-                    "message": str(e)
+                    "status": "unchanged"
                 }
-                logger.error(f"Error refreshing cache for {country}: {e}")
+            else:
+                articles_by_country[country] = articles
+                versions[country] = version
+                results[country] = {
+                    "status": "success",
+                    "article_count": len(articles)
+                }
+                logger.info(f"Fetched {len(articles)} articles for {country}")
+        
+        # Apply every successful country in one batch and save the cache once
+        article_cache.set_many_articles(articles_by_country, versions)
         
         response = {
             "message": "Cache refresh completed",
@@ -190,12 +671,15 @@ async def refresh_cache(request: RefreshCacheRequest):
         
         # Log a summary of the refresh operation
         success_count = sum(1 for country, result in results.items() if result["status"] == "success")
+        unchanged_count = sum(1 for country, result in results.items() if result["status"] == "unchanged")
         error_count = sum(1 for country, result in results.items() if result["status"] == "error")
         total_articles = sum(result["article_count"] for country, result in results.items() 
                             if result["status"] == "success" and "article_count" in result)
         
-        logger.info(f"POST /refresh-cache - Completed: {success_count} countries successful, {error_count} failed, {total_articles} total articles cached")
+        logger.info(f"POST /refresh-cache - Completed: {success_count} countries successful, {unchanged_count} unchanged, {error_count} failed, {total_articles} total articles cached")
         return response
+    except ReadBudgetExceeded:
+        raise
     except Exception as e:
         logger.error(f"Error in refresh cache endpoint: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -210,6 +694,7 @@ async def get_cache_status():
     try:
         logger.info("GET /cache-status - Request received")
         status = article_cache.get_cache_status()
+        status["read_budget"] = read_budget.usage()
         
         # Log detailed information about the cache status
         cached_countries = status.get("cached_countries", [])
@@ -224,12 +709,25 @@ async def get_cache_status():
         logger.error(f"Error getting cache status: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Expose metrics in the Prometheus text format
+    
+    Request latency histograms per route, ArticleCache hit/miss/eviction counters
+    per country, refresh durations, and Firebase read counts, latencies and bytes
+    per AsyncFirebaseClient method.
+    """
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
 @app.post("/set-whitelisted-countries")
 async def set_whitelisted_countries(request: RefreshCacheRequest):
     """
     Set the list of whitelisted countries
     
-    Only these countries will be stored in the cache.
+    Only these countries will be stored in the cache. They are pinned: with
+    AUTO_WHITELIST_SIZE set, the most requested countries are whitelisted on top
+    of them, but pinned countries are never demoted automatically.
     """
     try:
         logger.info(f"POST /set-whitelisted-countries - Request received with countries: {request.countries}")
@@ -264,18 +762,85 @@ async def set_whitelisted_countries(request: RefreshCacheRequest):
         logger.error(f"Error setting whitelisted countries: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/all-data")
+@app.post("/set-cache-depths")
+async def set_cache_depths(request: CacheDepthRequest):
+    """
+    Set how many articles are cached per country
+    
+    Requests with a limit up to a country's depth are served from the cache.
+    """
+    try:
+        logger.info(f"POST /set-cache-depths - Request received with depths: {request.depths}")
+        
+        invalid = {country: depth for country, depth in request.depths.items() if not 1 <= depth <= MAX_ARTICLE_LIMIT}
+        if invalid:
+            raise HTTPException(status_code=400, detail=f"Cache depths must be between 1 and {MAX_ARTICLE_LIMIT}: {invalid}")
+        
+        article_cache.set_cache_depths(request.depths)
+        
+        return {
+            "message": "Cache depths updated",
+            "default_cache_depth": DEFAULT_CACHE_DEPTH,
+            "cache_depths": article_cache.cache_depths
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error setting cache depths: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/export", dependencies=[Depends(admit_expensive_read)])
+async def export_data(
+    gzip: bool = Query(default=False, description="Compress the stream with gzip"),
+    page_size: int = Query(default=100, ge=1, le=1000, description="Children read from Firebase per request")
+):
+    """
+    Stream the whole database as newline-delimited JSON
+    
+    Walks the database node by node and country by country, reading page_size
+    children at a time, so memory stays bounded by one page instead of growing
+    with the database. Each line is {"path": ..., "key": ..., "value": ...}; for
+    example an article is {"path": "articles/USA", "key": <article id>, "value": <article>}.
+    """
+    logger.info(f"GET /export - Request received with gzip={gzip}, page_size={page_size}")
+    
+    async def ndjson_lines():
+        compressor = zlib.compressobj(wbits=31) if gzip else None
+        record_count = 0
+        try:
+            async for record in firebase_client.iter_export(page_size):
+                line = encode_json(record) + b"\n"
+                record_count += 1
+                if compressor is not None:
+                    chunk = compressor.compress(line)
+                    if chunk:
+                        yield chunk
+                else:
+                    yield line
+            if compressor is not None:
+                yield compressor.flush()
+            logger.info(f"GET /export - Completed: streamed {record_count} records")
+        except Exception as e:
+            # Headers are already sent, so the error can only end the stream
+            logger.error(f"GET /export - Export failed after {record_count} records: {e}")
+            raise
+    
+    headers = {"Content-Encoding": "gzip"} if gzip else {}
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson", headers=headers)
+
+@app.get("/all-data", deprecated=True, dependencies=[Depends(admit_expensive_read)])
 async def get_all_data():
     """
     Get all data from the database (for debugging purposes)
     
-    WARNING: This can be a large amount of data
+    WARNING: This can be a large amount of data. Deprecated in favour of /export,
+    which streams the database in bounded memory.
     """
     try:
         logger.info("GET /all-data - Request received")
         logger.warning("GET /all-data - Retrieving all data from Firebase (potentially large amount of data)")
         
-        data = firebase_client.get_all_data()
+        data = await firebase_client.get_all_data()
         
         # Calculate approximate size of the data for logging
         data_size = len(str(data))
@@ -288,11 +853,13 @@ async def get_all_data():
             "data": data,
             "approximate_size_kb": data_size_kb
         }
+    except ReadBudgetExceeded:
+        raise
     except Exception as e:
         logger.error(f"Error getting all data: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/all-articles/{country}")
+@app.get("/all-articles/{country}", dependencies=[Depends(admit_expensive_read)])
 async def get_all_articles_by_country(country: str):
     """
     Get all articles for a specific country (for debugging purposes)
@@ -304,7 +871,7 @@ async def get_all_articles_by_country(country: str):
         country = country.upper()
         logger.info(f"GET /all-articles/{country} - Request received")
         
-        articles = firebase_client.get_articles_by_country(country)
+        articles = await firebase_client.get_articles_by_country(country)
         
         # Count the number of dates and articles
         if isinstance(articles, dict):
@@ -319,9 +886,106 @@ async def get_all_articles_by_country(country: str):
             "country": country,
             "articles": articles
         }
+    except ReadBudgetExceeded:
+        raise
     except Exception as e:
         logger.error(f"Error getting all articles for {country}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/all-articles/{country}/page", dependencies=[Depends(admit_read)])
+async def get_all_articles_page(
+    country: str,
+    page_size: int = Query(default=20, ge=1, le=200, description="Number of entries (date buckets or articles) per page"),
+    after: Optional[str] = Query(default=None, description="Key to continue after, from a previous next_after")
+):
+    """
+    Get one page of a country's raw article tree
+    
+    Each page is a single key-ordered range read of the country's children (date
+    buckets, or articles stored directly under the country), so browsing the
+    whole tree costs one page per request instead of the full subtree.
+    
+    Parameters:
+    - country: The country code (e.g., 'USA')
+    - page_size: Number of children per page (default: 20, max: 200)
+    - after: Optional key to continue after (the previous page's next_after)
+    """
+    try:
+        country = country.upper()
+        logger.info(f"GET /all-articles/{country}/page - Request received with page_size={page_size}, after={after}")
+        
+        children = await firebase_client.get_children_page(f"articles/{country}", page_size, after)
+        next_after = children[-1][0] if len(children) == page_size else None
+        
+        logger.info(f"GET /all-articles/{country}/page - Returning {len(children)} entries")
+        return {
+            "country": country,
+            "count": len(children),
+            "page_size": page_size,
+            "articles": dict(children),
+            "next_after": next_after
+        }
+    except ReadBudgetExceeded:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting page of all articles for {country}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/all-articles/{country}/counts", dependencies=[Depends(admit_read)])
+async def get_all_articles_counts(country: str):
+    """
+    Count a country's dates and articles without downloading article bodies
+    
+    Parameters:
+    - country: The country code (e.g., 'USA')
+    """
+    try:
+        country = country.upper()
+        logger.info(f"GET /all-articles/{country}/counts - Request received")
+        
+        counts = await firebase_client.get_article_counts(country)
+        
+        return {
+            "country": country,
+            **counts
+        }
+    except ReadBudgetExceeded:
+        raise
+    except Exception as e:
+        logger.error(f"Error counting articles for {country}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/admin/profile/start", dependencies=[Depends(require_admin)])
+async def start_profile(
+    duration: float = Query(default=30, gt=0, le=600, description="Seconds to sample before the profile is written"),
+    interval: float = Query(default=0.005, ge=0.001, le=1, description="Seconds between stack samples")
+):
+    """
+    Start a timed whole-process profile
+    
+    Samples the stacks of all threads until `duration` has passed or
+    /admin/profile/stop is called, then writes them to logs/profile-<time>.folded
+    in the folded format read by flamegraph.pl and speedscope.
+    """
+    try:
+        stack_sampler.start(duration, interval)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return stack_sampler.status()
+
+@app.post("/admin/profile/stop", dependencies=[Depends(require_admin)])
+async def stop_profile():
+    """Stop the running profile early and write it out"""
+    if not stack_sampler.is_running():
+        raise HTTPException(status_code=409, detail="No profile is running")
+    # Joining the sampler thread blocks until the profile is written
+    await asyncio.to_thread(stack_sampler.stop)
+    return stack_sampler.status()
+
+@app.get("/admin/profile", dependencies=[Depends(require_admin)])
+async def get_profile_status():
+    """Get the progress of the running profile and the path of the last one written"""
+    return stack_sampler.status()
+
 if __name__ == "__main__":
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
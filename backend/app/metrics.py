@@ -0,0 +1,204 @@
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Latency buckets in seconds, from a prepared-body cache hit to a full country download
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# A metric family as rendered: (name, type, help, [(labels, value), ...])
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+
+class Counter:
+    """
+    Monotonic counter with a fixed set of label names
+
+    Updates are plain dict increments with no locking: everything that records
+    metrics runs on the event loop thread.
+    """
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1) -> None:
+        """Add to the counter of a label combination"""
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def collect(self) -> List[Family]:
+        samples = [(dict(zip(self.labelnames, labels)), value) for labels, value in self.values.items()]
+        return [(self.name, "counter", self.help_text, samples)]
+
+
+class Histogram:
+    """Histogram with fixed buckets and a fixed set of label names (see Counter on locking)"""
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # Per label combination: [per-bucket counts (last one is +Inf), sum, count]
+        self.values: Dict[Tuple[str, ...], List[Any]] = {}
+
+    def observe(self, value: float, labels: Tuple[str, ...] = ()) -> None:
+        """Record one observation"""
+        state = self.values.get(labels)
+        if state is None:
+            state = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    def collect(self) -> List[Family]:
+        samples = []
+        for labels, (counts, total, count) in self.values.items():
+            base = dict(zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                samples.append(({**base, "le": _format_value(bound)}, cumulative))
+            samples.append(({**base, "__suffix": "_sum"}, total))
+            samples.append(({**base, "__suffix": "_count"}, count))
+        return [(self.name, "histogram", self.help_text, samples)]
+
+
+class MetricsRegistry:
+    """Metrics to expose on /metrics, plus collectors that read other components' counters"""
+
+    def __init__(self):
+        self.metrics: List[Any] = []
+        self.collectors: List[Callable[[], Iterable[Family]]] = []
+
+    def counter(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, help_text, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[Family]]) -> None:
+        """Register a function producing metric families at scrape time"""
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format"""
+        families: List[Family] = []
+        for metric in self.metrics:
+            families.extend(metric.collect())
+        for collector in self.collectors:
+            families.extend(collector())
+
+        lines = []
+        for name, metric_type, help_text, samples in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in samples:
+                suffix = labels.pop("__suffix", "_bucket" if "le" in labels else "")
+                lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (key + '="' + str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+               for key, value in labels.items())
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+REGISTRY = MetricsRegistry()
+
+REQUEST_DURATION = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("route", "method", "status")
+)
+FIREBASE_REQUESTS = REGISTRY.counter(
+    "firebase_requests_total", "Realtime Database REST reads by client method and HTTP status", ("method", "status")
+)
+FIREBASE_DURATION = REGISTRY.histogram(
+    "firebase_request_duration_seconds", "Realtime Database REST read latency by client method", ("method",)
+)
+FIREBASE_BYTES = REGISTRY.counter(
+    "firebase_response_bytes_total", "Bytes downloaded from the Realtime Database by client method", ("method",)
+)
+REFRESH_DURATION = REGISTRY.histogram(
+    "cache_refresh_duration_seconds", "Time to refresh one country's cache entry", ("trigger",)
+)
+
+
+def register_cache(cache: Any, registry: MetricsRegistry = REGISTRY) -> None:
+    """
+    Expose an ArticleCache's per-country hit, miss, eviction and rejection counters
+
+    Countries come from request paths, so only whitelisted or cached countries get
+    their own label; the rest are summed into country="other" to bound cardinality.
+
+    Args:
+        cache: The article cache to expose
+        registry: Registry to add the cache's collector to
+    """
+    def collect() -> List[Family]:
+        families = []
+        labelled = set(cache.get_whitelisted_countries()) | set(cache.cache)
+        for name, counter in cache.stats.items():
+            other = 0
+            samples = []
+            for country, value in counter.items():
+                if country in labelled:
+                    samples.append(({"country": country}, value))
+                else:
+                    other += value
+            samples.append(({"country": "other"}, other))
+            families.append((f"article_cache_{name}_total", "counter", f"ArticleCache {name} per country", samples))
+        families.append(("article_cache_bytes", "gauge", "Approximate memory held by the article cache",
+                         [({}, cache.get_total_bytes())]))
+        families.append(("article_cache_countries", "gauge", "Countries held in the article cache",
+                         [({}, len(cache.cache))]))
+        return families
+    registry.add_collector(collect)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording the latency of every HTTP request by route template"""
+
+    def __init__(self, app: Callable):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status: Optional[int] = None
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # Label by the matched route template, never the raw path, to bound cardinality
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_DURATION.observe(time.perf_counter() - start, (route, scope["method"], str(status or 500)))
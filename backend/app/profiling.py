@@ -0,0 +1,219 @@
+import cProfile
+import logging
+import os
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def token_matches(supplied: Optional[str], admin_token: Optional[str]) -> bool:
+    """Check a supplied admin token in constant time (always False when no admin token is configured)"""
+    if not admin_token or not supplied:
+        return False
+    return secrets.compare_digest(supplied.encode(), admin_token.encode())
+
+
+def _timestamp() -> str:
+    """Local time with milliseconds, for profile file names"""
+    now = time.time()
+    return time.strftime("%Y%m%d-%H%M%S", time.localtime(now)) + f"-{int(now * 1000) % 1000:03d}"
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware running cProfile over a fraction of HTTP requests
+
+    A request is profiled when it is randomly sampled (sample_rate) or carries the
+    admin token in the X-Profile header. Each profile is written to output_dir as
+    a pstats .prof file (open with snakeviz, or flameprof for a flame graph).
+
+    cProfile profiles the event loop thread, so coroutines of other requests that
+    run while the profiled one is awaiting show up in its profile too. Only one
+    request is profiled at a time; requests arriving meanwhile are not profiled.
+    """
+
+    def __init__(self, app: Callable, output_dir: str, sample_rate: float = 0.0,
+                 admin_token: Optional[str] = None):
+        """
+        Initialize the middleware
+
+        Args:
+            app: The wrapped ASGI app
+            output_dir: Directory the .prof files are written to
+            sample_rate: Fraction of requests profiled without being asked to
+            admin_token: Token that must be sent in X-Profile to profile a request on demand
+        """
+        self.app = app
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate
+        self.admin_token = admin_token
+        self.busy = False
+
+    def _wants_profile(self, scope: Dict[str, Any]) -> bool:
+        """Whether to profile a request: on demand with the admin token, or sampled"""
+        if self.busy:
+            return False
+        if self.admin_token:
+            for name, value in scope.get("headers", []):
+                if name == b"x-profile":
+                    if token_matches(value.decode("latin-1"), self.admin_token):
+                        return True
+                    break
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http" or not self._wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        self.busy = True
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiler.disable()
+            self.busy = False
+            elapsed = time.perf_counter() - start
+            route = getattr(scope.get("route"), "path", scope.get("path", ""))
+            name = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "root"
+            path = os.path.join(self.output_dir, f"request-{_timestamp()}-{name}.prof")
+            try:
+                os.makedirs(self.output_dir, exist_ok=True)
+                profiler.dump_stats(path)
+                logger.info(f"Profiled {scope['method']} {scope.get('path', '')} ({elapsed * 1000:.1f} ms) to {path}")
+            except OSError as e:
+                logger.error(f"Error writing request profile to {path}: {e}")
+
+
+class StackSampler:
+    """
+    Statistical whole-process profiler
+
+    A background thread samples the stack of every other thread every `interval`
+    seconds and counts identical stacks. The result is written in the folded
+    format ("thread;outer;...;inner count" per line) read by flamegraph.pl,
+    speedscope and inferno. Sampling costs a little CPU per interval and nothing
+    when stopped, so it is safe to run against production traffic.
+    """
+
+    def __init__(self, output_dir: str):
+        """
+        Initialize the sampler
+
+        Args:
+            output_dir: Directory the .folded files are written to
+        """
+        self.output_dir = output_dir
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.started_at: Optional[float] = None
+        self.duration = 0.0
+        self.interval = 0.0
+        self.samples = 0
+        self.last_output: Optional[str] = None
+
+    def is_running(self) -> bool:
+        """Whether a profile is being recorded"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration: float, interval: float = 0.005) -> None:
+        """
+        Start sampling for up to `duration` seconds
+
+        Args:
+            duration: Seconds to sample before the profile is written automatically
+            interval: Seconds between samples
+
+        Raises:
+            RuntimeError: If a profile is already running
+        """
+        with self._lock:
+            if self.is_running():
+                raise RuntimeError("A profile is already running")
+            self._stop.clear()
+            self.started_at = time.time()
+            self.duration = duration
+            self.interval = interval
+            self.samples = 0
+            self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+            self._thread.start()
+        logger.info(f"Started stack sampling for {duration}s every {interval * 1000:.1f} ms")
+
+    def stop(self) -> Optional[str]:
+        """
+        Stop sampling early and wait for the profile to be written
+
+        Returns:
+            Path of the folded profile, or None if nothing was running
+        """
+        with self._lock:
+            thread = self._thread
+            if thread is None or not thread.is_alive():
+                return None
+            self._stop.set()
+        thread.join()
+        return self.last_output
+
+    def status(self) -> Dict[str, Any]:
+        """Whether a profile is running, its progress and the last profile written"""
+        return {
+            "running": self.is_running(),
+            "started_at": self.started_at,
+            "duration": self.duration,
+            "interval": self.interval,
+            "samples": self.samples,
+            "last_output": self.last_output
+        }
+
+    def _run(self) -> None:
+        """Sample until stopped or the duration has passed, then write the profile"""
+        stacks: Counter = Counter()
+        own_id = threading.get_ident()
+        thread_names: Dict[int, str] = {}
+        deadline = time.monotonic() + self.duration
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            if len(thread_names) != threading.active_count():
+                thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stacks[_fold_stack(thread_names.get(thread_id, str(thread_id)), frame)] += 1
+            self.samples += 1
+            self._stop.wait(self.interval)
+        self.last_output = self._write(stacks)
+
+    def _write(self, stacks: Counter) -> Optional[str]:
+        """Write the counted stacks in folded format, returning the file's path"""
+        path = os.path.join(self.output_dir, f"profile-{_timestamp()}.folded")
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            with open(path, "w") as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            logger.info(f"Wrote stack profile ({self.samples} samples, {len(stacks)} distinct stacks) to {path}")
+            return path
+        except OSError as e:
+            logger.error(f"Error writing stack profile to {path}: {e}")
+            return None
+
+
+def _fold_stack(thread_name: str, frame: Any) -> str:
+    """One folded-format stack, outermost frame first, rooted at the thread name"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    names.append(thread_name.replace(";", "_"))
+    return ";".join(reversed(names))
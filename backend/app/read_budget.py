@@ -0,0 +1,213 @@
+import contextvars
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Number of slots the rolling window is divided into
+WINDOW_SLOTS = 60
+
+# Caller the Firebase reads being made are charged to (None for background work)
+_current_client: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_client", default=None)
+
+
+class ReadBudgetExceeded(Exception):
+    """A Firebase read was refused because it would overspend the read budget"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def current_client() -> Optional[str]:
+    """The caller Firebase reads are currently charged to"""
+    return _current_client.get()
+
+
+@contextmanager
+def unattributed() -> Iterator[None]:
+    """Charge the reads made inside the block to no caller (e.g. background refreshes)"""
+    token = _current_client.set(None)
+    try:
+        yield
+    finally:
+        _current_client.reset(token)
+
+
+class ReadBudget:
+    """
+    Firebase read accounting over a rolling window, with per-caller token buckets
+
+    Every REST read is recorded with its size. Over the last `window` seconds the
+    budget allows `max_bytes` downloaded and `max_calls` reads (0 for no limit).
+    From `degrade_at` of either limit the budget is "tight" and expensive reads
+    should be avoided; once a limit is reached it is exhausted and reads are
+    refused.
+
+    Each caller (client IP) also gets a token bucket of `client_burst` bytes
+    refilled at `client_rate` bytes per second, charged with the size of the reads
+    made for it, so one caller can't spend the budget for everyone. A read is
+    admitted while the bucket is positive and may overdraw it.
+    """
+
+    def __init__(self, window: float = 3600, max_bytes: int = 0, max_calls: int = 0, degrade_at: float = 0.8,
+                 client_rate: float = 0, client_burst: float = 0, max_clients: int = 10000):
+        """
+        Initialize the budget
+
+        Args:
+            window: Length of the rolling window in seconds
+            max_bytes: Bytes that may be downloaded per window (0 for no limit)
+            max_calls: Reads that may be made per window (0 for no limit)
+            degrade_at: Fraction of a limit from which the budget counts as tight
+            client_rate: Bytes per second each caller's bucket refills by (0 to disable the buckets)
+            client_burst: Capacity of each caller's bucket in bytes
+            max_clients: Buckets kept before the least recently used ones are dropped
+        """
+        self.window = window
+        self.max_bytes = max_bytes
+        self.max_calls = max_calls
+        self.degrade_at = degrade_at
+        self.client_rate = client_rate
+        self.client_burst = client_burst or client_rate
+        self.max_clients = max_clients
+        self.slot_seconds = window / WINDOW_SLOTS
+        # Per slot: [slot index, bytes, calls], oldest first
+        self.slots: Deque[List[Any]] = deque()
+        self.window_bytes = 0
+        self.window_calls = 0
+        # Per caller: [tokens, time of last refill]
+        self.buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+        self.refused = 0
+
+    def _prune(self, now: float) -> int:
+        """Drop slots that have left the window, returning the current slot index"""
+        index = int(now // self.slot_seconds)
+        while self.slots and self.slots[0][0] <= index - WINDOW_SLOTS:
+            _, nbytes, calls = self.slots.popleft()
+            self.window_bytes -= nbytes
+            self.window_calls -= calls
+        return index
+
+    def record(self, nbytes: int, client: Optional[str] = None) -> None:
+        """
+        Account for one completed read
+
+        Args:
+            nbytes: Size of the response body
+            client: Caller to charge the bytes to
+        """
+        index = self._prune(time.time())
+        if not self.slots or self.slots[-1][0] != index:
+            self.slots.append([index, 0, 0])
+        self.slots[-1][1] += nbytes
+        self.slots[-1][2] += 1
+        self.window_bytes += nbytes
+        self.window_calls += 1
+        if client is not None and self.client_rate > 0:
+            self._refill(client)[0] -= nbytes
+
+    def fraction_used(self) -> float:
+        """Share of the tighter of the byte and call limits used in the current window"""
+        self._prune(time.time())
+        fractions = [0.0]
+        if self.max_bytes > 0:
+            fractions.append(self.window_bytes / self.max_bytes)
+        if self.max_calls > 0:
+            fractions.append(self.window_calls / self.max_calls)
+        return max(fractions)
+
+    def is_tight(self) -> bool:
+        """Whether the budget is close enough to its limit that expensive reads should be avoided"""
+        return self.fraction_used() >= self.degrade_at
+
+    def is_exhausted(self) -> bool:
+        """Whether the budget for the current window is spent"""
+        return self.fraction_used() >= 1
+
+    def check(self, client: Optional[str] = None, expensive: bool = False) -> None:
+        """
+        Admit a read, or refuse it
+
+        Args:
+            client: Caller the read is for (None skips the caller's bucket)
+            expensive: Whether the read may download a large part of the database;
+                expensive reads are refused as soon as the budget is tight
+
+        Raises:
+            ReadBudgetExceeded: If the read would overspend the budget
+        """
+        if self.is_exhausted():
+            self._refuse("Firebase read budget for the current window is spent", self._window_retry_after())
+        if expensive and self.is_tight():
+            self._refuse("Firebase read budget is nearly spent; expensive reads are paused",
+                         self._window_retry_after())
+        if client is not None and self.client_rate > 0:
+            tokens = self._refill(client)[0]
+            if tokens <= 0:
+                self._refuse(f"Read quota of {client} is spent", max(1, math.ceil(-tokens / self.client_rate)))
+
+    def _refuse(self, message: str, retry_after: int) -> None:
+        """Count and log a refused read, then raise"""
+        self.refused += 1
+        logger.warning(f"{message} (retry after {retry_after}s)")
+        raise ReadBudgetExceeded(message, retry_after)
+
+    def _window_retry_after(self) -> int:
+        """Seconds until the oldest recorded slot leaves the window"""
+        if not self.slots:
+            return 1
+        expires = (self.slots[0][0] + WINDOW_SLOTS) * self.slot_seconds
+        return max(1, math.ceil(expires - time.time()))
+
+    def _refill(self, client: str) -> List[float]:
+        """Get a caller's bucket, topped up for the time since it was last used"""
+        now = time.monotonic()
+        bucket = self.buckets.get(client)
+        if bucket is None:
+            bucket = self.buckets[client] = [self.client_burst, now]
+            if len(self.buckets) > self.max_clients:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(client)
+            bucket[0] = min(self.client_burst, bucket[0] + (now - bucket[1]) * self.client_rate)
+            bucket[1] = now
+        return bucket
+
+    def usage(self) -> Dict[str, Any]:
+        """Spending in the current window, for status endpoints"""
+        return {
+            "window_seconds": self.window,
+            "bytes": self.window_bytes,
+            "calls": self.window_calls,
+            "max_bytes": self.max_bytes,
+            "max_calls": self.max_calls,
+            "fraction_used": round(self.fraction_used(), 4),
+            "tight": self.is_tight(),
+            "exhausted": self.is_exhausted(),
+            "refused": self.refused,
+            "tracked_clients": len(self.buckets)
+        }
+
+
+class ClientContext:
+    """ASGI middleware charging the Firebase reads made for each HTTP request to its client address"""
+
+    def __init__(self, app: Callable):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        client = scope.get("client")
+        token = _current_client.set(client[0] if client else "unknown")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_client.reset(token)
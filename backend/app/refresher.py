@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+from app.cache import ArticleCache
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class CacheRefresher:
+    """
+    Background task that keeps the whitelisted and cached countries fresh
+
+    Each cached country gets a TTL of `interval` seconds from its last refresh,
+    shortened by a random fraction of up to `jitter` so countries cached at the
+    same moment don't all come due together. Requests keep being served from the
+    stale entry while its refresh runs (stale-while-revalidate); a request for a
+    stale country also schedules its refresh right away instead of waiting for the
+    next check.
+
+    Countries that are already overdue when first seen (never cached, or loaded
+    stale from the store after a restart) are spread over `startup_spread`
+    seconds instead of all refreshing at the first scan, and at most
+    `concurrency` background refreshes run at a time.
+    """
+
+    def __init__(self, cache: ArticleCache, refresh: Callable[[str], Awaitable[Optional[int]]], interval: float,
+                 jitter: float = 0.1, check_interval: float = 60, startup_spread: float = 30,
+                 concurrency: int = 5):
+        """
+        Initialize the refresher
+
+        Args:
+            cache: The article cache to keep fresh
+            refresh: Coroutine function refreshing one country's cache entry, returning
+                the number of articles fetched (None when nothing changed)
+            interval: Seconds a country's cached articles stay fresh
+            jitter: Fraction of the interval refreshes are randomly brought forward by
+            check_interval: Seconds between scans for countries that are due
+            startup_spread: Countries that are overdue when first seen are refreshed at a
+                random point within this many seconds
+            concurrency: Maximum number of background refreshes running at a time
+        """
+        self.cache = cache
+        self.refresh = refresh
+        self.interval = interval
+        self.jitter = jitter
+        self.check_interval = check_interval
+        self.startup_spread = startup_spread
+        self.concurrency = concurrency
+        self.next_refresh: Dict[str, float] = {}
+        self.refreshing: Set[str] = set()
+        self._tasks: Set["asyncio.Task[None]"] = set()
+        self._loop_task: Optional["asyncio.Task[None]"] = None
+        # Created on first use so it belongs to the running event loop
+        self._refresh_slots: Optional[asyncio.Semaphore] = None
+
+    def start(self) -> None:
+        """Start the background scan loop"""
+        if self._loop_task is None:
+            logger.info(f"Starting background cache refresher (interval={self.interval}s, jitter={self.jitter})")
+            self._loop_task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        """Stop the scan loop and cancel refreshes that are still running"""
+        tasks = list(self._tasks)
+        if self._loop_task is not None:
+            tasks.append(self._loop_task)
+            self._loop_task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        logger.info("Background cache refresher stopped")
+
+    def is_stale(self, country: str) -> bool:
+        """Check whether a cached country is past its TTL"""
+        last_refresh = self.cache.get_last_refresh_time(country)
+        return last_refresh is not None and time.time() - last_refresh >= self.interval
+
+    def revalidate_if_stale(self, country: str) -> None:
+        """Schedule a background refresh of a country being served stale"""
+        if self.is_stale(country):
+            self._schedule(country.upper())
+
+    def _due_time(self, country: str) -> float:
+        """When a country should next be refreshed, jittered"""
+        now = time.time()
+        last_refresh = self.cache.get_last_refresh_time(country)
+        if last_refresh is not None:
+            due = last_refresh + self.interval * (1 - random.uniform(0, self.jitter))
+            if due > now:
+                return due
+        # Never cached or already overdue: spread these out rather than refreshing them all at once
+        return now + random.uniform(0, self.startup_spread)
+
+    def check(self) -> None:
+        """Schedule a refresh for every whitelisted or cached country that is due"""
+        now = time.time()
+        tracked = set(self.cache.get_whitelisted_countries()) | set(self.cache.get_cached_countries())
+        # Forget countries removed from the whitelist or evicted
+        for country in list(self.next_refresh):
+            if country not in tracked:
+                del self.next_refresh[country]
+        for country in tracked:
+            if country not in self.next_refresh:
+                self.next_refresh[country] = self._due_time(country)
+            if self.next_refresh[country] <= now:
+                self._schedule(country)
+
+    def _schedule(self, country: str) -> None:
+        """Start refreshing a country unless a refresh is already running"""
+        if country in self.refreshing:
+            return
+        self.refreshing.add(country)
+        task = asyncio.ensure_future(self._refresh_country(country))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh_country(self, country: str) -> None:
+        """Refresh one country and work out its next due time"""
+        if self._refresh_slots is None:
+            self._refresh_slots = asyncio.Semaphore(self.concurrency)
+        try:
+            async with self._refresh_slots:
+                logger.info(f"Background refresh of {country} started")
+                await self.refresh(country)
+                logger.info(f"Background refresh of {country} completed")
+        except Exception as e:
+            # Keep serving the stale entry and retry at the next scan
+            logger.error(f"Background refresh of {country} failed: {e}")
+        finally:
+            self.refreshing.discard(country)
+            self.next_refresh[country] = self._due_time(country)
+            if self.cache.get_last_refresh_time(country) is None:
+                # Nothing was cached (failure, or the country has no articles): retry after a check interval
+                self.next_refresh[country] = time.time() + self.check_interval
+
+    def _seconds_until_next_check(self) -> float:
+        """Time until the next country comes due, capped at check_interval"""
+        pending = [due for country, due in self.next_refresh.items() if country not in self.refreshing]
+        if not pending:
+            return self.check_interval
+        # Never spin: a due country that wasn't scheduled (scan error) waits at least a second
+        return min(self.check_interval, max(min(pending) - time.time(), 1))
+
+    async def _run(self) -> None:
+        """Scan for due countries when the next one comes due, and at least every check_interval seconds"""
+        while True:
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Error scanning for countries to refresh: {e}")
+            await asyncio.sleep(self._seconds_until_next_check())
@@ -0,0 +1,243 @@
+import gzip
+import hashlib
+import json
+import logging
+from email.utils import formatdate
+from typing import Dict, Any, List, Optional
+
+from fastapi import Response
+
+from app.server_timing import span
+
+# Brotli is optional: without it only gzip and identity bodies are prepared
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Limits whose response bodies are serialized ahead of time for cached countries
+PRESERIALIZED_LIMITS = (10, 25, 50, 100)
+
+# Compression levels favour speed: bodies are rebuilt on every refresh
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Content encodings a prepared body can be sent in
+COMPRESSORS = {"gzip": lambda body: gzip.compress(body, compresslevel=GZIP_LEVEL)}
+if brotli is not None:
+    COMPRESSORS["br"] = lambda body: brotli.compress(body, quality=BROTLI_QUALITY)
+AVAILABLE_ENCODINGS = ["identity", *COMPRESSORS]
+
+
+@span("serialize")
+def encode_json(content: Any) -> bytes:
+    """Serialize content exactly like FastAPI's default JSONResponse"""
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def articles_envelope(country: str, articles: List[Dict[str, Any]], limit: int, view: str, source: str,
+                      next_cursor: Optional[str] = None) -> Dict[str, Any]:
+    """Build the /articles/{country} response body"""
+    return {
+        "country": country,
+        "count": len(articles),
+        "limit": limit,
+        "view": view,
+        "source": source,
+        "articles": articles,
+        "next_cursor": next_cursor
+    }
+
+
+class PreparedBody:
+    """
+    A serialized response body with its compressed variants
+
+    Each compressed variant is built the first time it is sent and kept from then
+    on, so rebuilding a country's bodies on refresh only serializes them, and
+    encodings (or limits and views) nobody asks for are never compressed.
+    """
+
+    def __init__(self, content: Any):
+        """
+        Serialize a response body
+
+        Args:
+            content: JSON-serializable response content
+        """
+        identity = encode_json(content)
+        self.variants: Dict[str, bytes] = {"identity": identity}
+        self.etag_base = make_etag_base(identity)
+
+    def variant(self, encoding: str) -> bytes:
+        """
+        Get the body in one content encoding, compressing it on first use
+
+        Args:
+            encoding: One of AVAILABLE_ENCODINGS
+
+        Returns:
+            The encoded body
+        """
+        body = self.variants.get(encoding)
+        if body is None:
+            with span("serialize"):
+                body = COMPRESSORS[encoding](self.variants["identity"])
+            self.variants[encoding] = body
+        return body
+
+    def etag(self, encoding: str) -> str:
+        """Strong ETag of one variant; compressed variants get their own suffix"""
+        return format_etag(self.etag_base, encoding)
+
+    def size(self) -> int:
+        """Total bytes held by the variants built so far"""
+        return sum(len(body) for body in self.variants.values())
+
+
+def make_etag_base(body: bytes) -> str:
+    """Content hash used as the opaque part of an ETag"""
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+def format_etag(etag_base: str, encoding: str = "identity") -> str:
+    """Quote an ETag, suffixed with the content encoding for compressed variants"""
+    if encoding == "identity":
+        return f'"{etag_base}"'
+    return f'"{etag_base}-{encoding}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag_base: str) -> bool:
+    """
+    Check an If-None-Match header against a body's ETag
+
+    Uses the weak comparison If-None-Match calls for, and treats the variants of
+    one body (identity, gzip, br) as the same content.
+
+    Args:
+        if_none_match: The request's If-None-Match header
+        etag_base: Content hash of the body
+
+    Returns:
+        True if the client already has this body
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        candidate = candidate.strip('"')
+        if candidate.split("-", 1)[0] == etag_base:
+            return True
+    return False
+
+
+def cache_headers(last_modified: Optional[float], max_age: int) -> Dict[str, str]:
+    """
+    HTTP caching headers for an article response
+
+    Args:
+        last_modified: When the cached data was last refreshed, None for data read
+            straight from Firebase (which clients must revalidate every time)
+        max_age: Seconds a client or proxy may reuse the response without revalidating
+
+    Returns:
+        Cache-Control and, when known, Last-Modified headers
+    """
+    if last_modified is None:
+        return {"Cache-Control": "no-cache"}
+    return {
+        "Cache-Control": f"public, max-age={max(0, int(max_age))}",
+        "Last-Modified": formatdate(last_modified, usegmt=True)
+    }
+
+
+def json_response(content: Any, if_none_match: Optional[str] = None, headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Serialize content into a Response with a strong ETag, or a 304 if the client has it
+
+    Args:
+        content: JSON-serializable response content
+        if_none_match: The request's If-None-Match header
+        headers: Extra response headers
+
+    Returns:
+        A 200 Response with the body, or a 304 Response without one
+    """
+    body = encode_json(content)
+    etag_base = make_etag_base(body)
+    response_headers = {"ETag": format_etag(etag_base)}
+    if headers:
+        response_headers.update(headers)
+    if etag_matches(if_none_match, etag_base):
+        return Response(status_code=304, headers=response_headers)
+    return Response(content=body, media_type="application/json", headers=response_headers)
+
+
+def choose_encoding(accept_encoding: Optional[str], available: List[str]) -> str:
+    """
+    Pick the best content encoding a client accepts
+
+    Args:
+        accept_encoding: The request's Accept-Encoding header
+        available: Encodings a body is available in
+
+    Returns:
+        "br", "gzip" or "identity"
+    """
+    if not accept_encoding:
+        return "identity"
+
+    accepted: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    for encoding in ("br", "gzip"):
+        if encoding in available and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return "identity"
+
+
+def prepared_response(prepared: PreparedBody, accept_encoding: Optional[str], if_none_match: Optional[str] = None,
+                      headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Send a prepared body in the best encoding the client accepts
+
+    Args:
+        prepared: The prepared body
+        accept_encoding: The request's Accept-Encoding header
+        if_none_match: The request's If-None-Match header
+        headers: Extra response headers
+
+    Returns:
+        A Response carrying the raw bytes, or a 304 Response if the client has them
+    """
+    encoding = choose_encoding(accept_encoding, AVAILABLE_ENCODINGS)
+    response_headers = {"Vary": "Accept-Encoding", "ETag": prepared.etag(encoding)}
+    if headers:
+        response_headers.update(headers)
+    if etag_matches(if_none_match, prepared.etag_base):
+        return Response(status_code=304, headers=response_headers)
+    if encoding != "identity":
+        response_headers["Content-Encoding"] = encoding
+    return Response(content=prepared.variant(encoding), media_type="application/json", headers=response_headers)
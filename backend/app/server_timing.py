@@ -0,0 +1,105 @@
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Phase timings of the request being handled
+_request_timings: contextvars.ContextVar[Optional["RequestTimings"]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+class RequestTimings:
+    """
+    Wall time spent in each phase of one request
+
+    Spans of the same phase may overlap, e.g. when several Firebase reads run
+    concurrently: a phase's duration is the time at least one of its spans was
+    open, so concurrent reads are not double counted.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        # Per phase: [accumulated seconds, open spans, start of the current open period]
+        self.phases: Dict[str, List[float]] = {}
+
+    def enter(self, name: str) -> None:
+        phase = self.phases.get(name)
+        if phase is None:
+            phase = self.phases[name] = [0.0, 0, 0.0]
+        if phase[1] == 0:
+            phase[2] = time.perf_counter()
+        phase[1] += 1
+
+    def exit(self, name: str) -> None:
+        phase = self.phases[name]
+        phase[1] -= 1
+        if phase[1] == 0:
+            phase[0] += time.perf_counter() - phase[2]
+
+    def durations(self) -> Dict[str, float]:
+        """Milliseconds per phase so far, plus the request total"""
+        durations = {name: round(phase[0] * 1000, 3) for name, phase in self.phases.items()}
+        durations["total"] = round((time.perf_counter() - self.start) * 1000, 3)
+        return durations
+
+    def header(self) -> str:
+        """The Server-Timing header value, e.g. cache;dur=0.05, firebase;dur=120.4, total;dur=123.9"""
+        return ", ".join(f"{name};dur={duration}" for name, duration in self.durations().items())
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """
+    Time a phase of the current request
+
+    A no-op outside a request (background refreshes, startup), so library code
+    can be instrumented unconditionally.
+
+    Args:
+        name: Phase name as shown in Server-Timing, e.g. "firebase"
+    """
+    timings = _request_timings.get()
+    if timings is None:
+        yield
+        return
+    timings.enter(name)
+    try:
+        yield
+    finally:
+        timings.exit(name)
+
+
+def current_timings() -> Optional[Dict[str, float]]:
+    """Milliseconds per phase of the current request so far, or None outside a request"""
+    timings = _request_timings.get()
+    return timings.durations() if timings is not None else None
+
+
+class ServerTimingMiddleware:
+    """ASGI middleware adding a Server-Timing header with the phase breakdown to every HTTP response"""
+
+    def __init__(self, app: Callable):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timings.header().encode("latin-1")))
+                # Let cross-origin pages read the timings through the Resource Timing API
+                headers.append((b"timing-allow-origin", b"*"))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = _request_timings.set(timings)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_timings.reset(token)
@@ -0,0 +1,50 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into a single in-flight call
+
+    The first caller for a key starts the call; everyone who asks for the same key
+    while it is running waits on that call and gets its result (or its exception).
+    """
+
+    def __init__(self):
+        """Initialize the single-flight group"""
+        self._in_flight: Dict[Hashable, "asyncio.Task[Any]"] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn once for all concurrent callers of the same key
+
+        Args:
+            key: Identifies calls that can share a result
+            fn: Zero-argument coroutine function performing the actual call
+
+        Returns:
+            The result of the shared call
+        """
+        task = self._in_flight.get(key)
+        if task is not None:
+            logger.info(f"Joining in-flight call for {key}")
+        else:
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+
+        # Shield the shared task so one caller disconnecting doesn't cancel it for the others
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: "asyncio.Task[Any]") -> None:
+        """Drop a finished call, unless a newer call for the key has already replaced it"""
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+    def in_flight(self) -> int:
+        """Number of calls currently running"""
+        return len(self._in_flight)
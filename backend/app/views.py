@@ -0,0 +1,121 @@
+import copy
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.firebase_client import article_sort_key
+
+# Representations of an article that /articles/{country} can return
+VIEWS = ("full", "summary")
+
+# What the map's story cards render (frontend/storyContainer.js::createNarrative)
+SUMMARY_METADATA_FIELDS = ("title", "articleTitle", "source", "siteName", "datePublished", "datePublishedUnix", "url")
+SUMMARY_TEXT_LENGTH = 250
+
+
+def summarize_article(article: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the lightweight summary representation of an article
+
+    Keeps the metadata the story cards show and the first SUMMARY_TEXT_LENGTH
+    characters of the article text, dropping hyperlinks, people, fact-check
+    details and media.
+
+    Args:
+        article: The full article
+
+    Returns:
+        The summary article
+    """
+    metadata = article.get("metadata") or {}
+    summary = {
+        "metadata": {field: metadata[field] for field in SUMMARY_METADATA_FIELDS if field in metadata},
+        "date": article.get("date"),
+        "id": article.get("id")
+    }
+
+    article_text = (article.get("content") or {}).get("articleText")
+    if article_text:
+        summary["content"] = {
+            "articleText": article_text[:SUMMARY_TEXT_LENGTH],
+            "articleTextTruncated": len(article_text) > SUMMARY_TEXT_LENGTH
+        }
+
+    return summary
+
+
+def encode_cursor(article: Dict[str, Any]) -> str:
+    """
+    Build the pagination cursor pointing just past an article
+
+    Args:
+        article: The last article of a page
+
+    Returns:
+        "<datePublishedUnix>,<id>"
+    """
+    published, article_id = article_sort_key(article)
+    return f"{published},{article_id}"
+
+
+def parse_cursor(cursor: str) -> Tuple[int, str]:
+    """
+    Parse a before= pagination cursor
+
+    Args:
+        cursor: "<datePublishedUnix>,<id>"
+
+    Returns:
+        The (datePublishedUnix, id) key articles must be ordered before
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    published, separator, article_id = cursor.partition(",")
+    if not separator or not article_id:
+        raise ValueError(f"Invalid cursor {cursor!r}, expected <datePublishedUnix>,<id>")
+    return int(published), article_id
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """
+    Parse a fields= query parameter
+
+    Args:
+        fields: Comma-separated dotted paths (e.g. "metadata.title,metadata.url")
+
+    Returns:
+        List of dotted paths, empty if no projection was requested
+    """
+    if not fields:
+        return []
+    return [field.strip() for field in fields.split(",") if field.strip()]
+
+
+def project_article(article: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    """
+    Keep only the requested fields of an article
+
+    The article "id" is always kept so clients can tell articles apart.
+
+    Args:
+        article: The article to project
+        fields: Dotted paths to keep; paths that don't exist are skipped
+
+    Returns:
+        A new article containing only the requested fields
+    """
+    projected: Dict[str, Any] = {"id": article.get("id")}
+    for field in fields:
+        parts = field.split(".")
+        value: Any = article
+        for part in parts:
+            if not isinstance(value, dict) or part not in value:
+                break
+            value = value[part]
+        else:
+            # Rebuild the nesting down to the selected value
+            target = projected
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            # Copy whole subtrees so later, deeper fields don't write into the cached article
+            target[parts[-1]] = copy.deepcopy(value) if isinstance(value, dict) else value
+    return projected
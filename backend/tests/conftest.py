@@ -0,0 +1,132 @@
+import asyncio
+import json
+import os
+from typing import Any, Awaitable, Callable
+
+import httpx
+import pytest
+
+from app.cache import ArticleCache
+from app.cache_store import JSONCacheStore
+from app.fake_rtdb import FakeRealtimeDatabase
+from app.firebase_client import AsyncFirebaseClient, article_sort_key
+from app.read_budget import ReadBudget
+from app.refresher import CacheRefresher
+from app.singleflight import SingleFlight
+
+RULES_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "database.rules.json")
+
+
+def make_article(title: str, published: int) -> dict:
+    """A stored article node"""
+    return {
+        "metadata": {"title": title, "datePublishedUnix": published, "datePublished": "2024-01-01"},
+        "content": {"articleText": f"Text of {title}"}
+    }
+
+
+def make_data() -> dict:
+    """GR: 30 flat articles (two sharing a timestamp), the newest 20 indexed; FR: date buckets"""
+    greece = {f"gr{i:02d}": make_article(f"gr{i:02d}", 1000 + i) for i in range(30)}
+    greece["gr29"]["metadata"]["datePublishedUnix"] = 1028
+    return {
+        "articles": {
+            "GR": greece,
+            "FR": {
+                "2024-01-01": {"fr0": make_article("fr0", 500), "fr1": make_article("fr1", 502)},
+                "2024-01-02": {"fr2": make_article("fr2", 501)}
+            }
+        },
+        "articleIndex": {"GR": {"latestArticles": [f"gr{i:02d}" for i in range(29, 9, -1)]}}
+    }
+
+
+def ids(articles: list) -> list:
+    """The ids of a list of articles, in order"""
+    return [article["id"] for article in articles]
+
+
+def newest_first(database: FakeRealtimeDatabase, country: str) -> list:
+    """The ids of a flat country's stored articles, newest first"""
+    articles = [{"id": article_id, **article} for article_id, article in database.data["articles"][country].items()]
+    return ids(sorted(articles, key=article_sort_key, reverse=True))
+
+
+@pytest.fixture
+def database() -> FakeRealtimeDatabase:
+    with open(RULES_PATH) as f:
+        rules = json.load(f)
+    return FakeRealtimeDatabase(make_data(), rules)
+
+
+@pytest.fixture
+def with_client(database: FakeRealtimeDatabase) -> Callable[..., Any]:
+    """
+    Run a coroutine function against an AsyncFirebaseClient reading the fake database
+
+    Usage: with_client(lambda client: client.query_articles_by_published("GR", 5)),
+    with client options (e.g. use_queries=False) as keyword arguments.
+    """
+    def run(fn: Callable[[AsyncFirebaseClient], Awaitable[Any]], **kwargs: Any) -> Any:
+        async def go() -> Any:
+            client = AsyncFirebaseClient(database_url="http://fake-rtdb", transport=database.transport(), **kwargs)
+            try:
+                return await fn(client)
+            finally:
+                await client.close()
+        return asyncio.run(go())
+    return run
+
+
+@pytest.fixture(scope="session")
+def main_module(tmp_path_factory: pytest.TempPathFactory) -> Any:
+    """The app module, imported against a fake database and a temporary cache directory"""
+    directory = tmp_path_factory.mktemp("app")
+    data_path = directory / "database.json"
+    data_path.write_text(json.dumps(make_data()))
+    with pytest.MonkeyPatch.context() as env:
+        env.setenv("FIREBASE_FAKE_DATA", str(data_path))
+        env.setenv("CACHE_DIR", str(directory / "data"))
+        env.setenv("BACKGROUND_REFRESH", "false")
+        env.setenv("LOG_LEVEL", "WARNING")
+        from app import main
+    return main
+
+
+@pytest.fixture
+def app_main(main_module: Any, database: FakeRealtimeDatabase, tmp_path: Any, monkeypatch: pytest.MonkeyPatch) -> Any:
+    """
+    The app module with fresh state for one test
+
+    The Firebase client reads the `database` fixture, and the cache (with GR
+    whitelisted) is persisted to the test's temporary directory.
+    """
+    main = main_module
+    budget = ReadBudget()
+    cache = ArticleCache(JSONCacheStore(str(tmp_path / "article_cache.json")), default_depth=main.DEFAULT_CACHE_DEPTH)
+    cache.set_whitelisted_countries(["GR"])
+    monkeypatch.setattr(main, "fake_database", database)
+    monkeypatch.setattr(main, "read_budget", budget)
+    monkeypatch.setattr(main, "firebase_client", AsyncFirebaseClient(
+        database_url="http://fake-rtdb", transport=database.transport(), budget=budget
+    ))
+    monkeypatch.setattr(main, "article_cache", cache)
+    monkeypatch.setattr(main, "cache_refresher", CacheRefresher(cache, main._refresh_country, interval=3600))
+    monkeypatch.setattr(main, "firebase_fetches", SingleFlight())
+    return main
+
+
+@pytest.fixture
+def with_api(app_main: Any) -> Callable[..., Any]:
+    """
+    Run a coroutine function against an HTTP client for the app
+
+    Usage: with_api(lambda http: http.get("/articles/GR"))
+    """
+    def run(fn: Callable[[httpx.AsyncClient], Awaitable[Any]]) -> Any:
+        async def go() -> Any:
+            transport = httpx.ASGITransport(app=app_main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                return await fn(http)
+        return asyncio.run(go())
+    return run
@@ -0,0 +1,170 @@
+import asyncio
+
+from conftest import ids, make_article, newest_first
+
+
+def test_limits_within_article_index_are_read_through_it(database, app_main, with_api):
+    response = with_api(lambda http: http.get("/articles/GR", params={"limit": 15}))
+
+    assert response.status_code == 200
+    assert ids(response.json()["articles"]) == newest_first(database, "GR")[:15]
+    # The layout check is the only query: 15 rounds up to the 20-entry index, not to 25
+    assert sum("orderBy" in url for url in database.requests) == 1
+    assert any("articleIndex" in url for url in database.requests)
+
+
+def refresh(with_api, *countries, full=False):
+    """POST /refresh-cache and return the per-country results"""
+    response = with_api(lambda http: http.post("/refresh-cache", json={"countries": list(countries), "full": full}))
+    assert response.status_code == 200
+    return response.json()["results"]
+
+
+def test_refresh_skips_unchanged_versions(database, app_main, with_api):
+    database.data["articleVersion"] = {"GR": 1}
+
+    assert refresh(with_api, "GR")["GR"]["status"] == "success"
+    assert app_main.article_cache.get_article_version("GR") == 1
+
+    database.requests.clear()
+    assert refresh(with_api, "GR")["GR"] == {"status": "unchanged"}
+    # Only the version stamp was read
+    assert database.requests == ["http://fake-rtdb/articleVersion/GR.json"]
+
+    database.data["articleVersion"]["GR"] = 2
+    database.data["articles"]["GR"]["gr30"] = make_article("gr30", 2000)
+    assert refresh(with_api, "GR")["GR"]["status"] == "success"
+    assert app_main.article_cache.get_article_version("GR") == 2
+    assert ids(app_main.article_cache.get_articles("GR"))[0] == "gr30"
+
+
+def test_deep_reads_keep_cached_version(database, app_main, with_api):
+    database.data["articleVersion"] = {"GR": 1}
+    refresh(with_api, "GR")
+    cache = app_main.article_cache
+    cached = ids(cache.get_articles("GR"))
+    refreshed_at = cache.get_last_refresh_time("GR")
+
+    response = with_api(lambda http: http.get("/articles/GR", params={"limit": 30}))
+
+    assert response.json()["source"] == "firebase"
+    assert response.json()["count"] == 30
+    # The deeper read is served without replacing the cached list, its version or its TTL
+    assert ids(cache.get_articles("GR")) == cached
+    assert cache.get_article_version("GR") == 1
+    assert cache.get_last_refresh_time("GR") == refreshed_at
+    assert refresh(with_api, "GR")["GR"] == {"status": "unchanged"}
+
+
+def test_etags_answer_revalidation_with_304(database, app_main, with_api):
+    refresh(with_api, "GR")
+
+    async def steps(http):
+        first = await http.get("/articles/GR", headers={"Accept-Encoding": "gzip"})
+        again = await http.get("/articles/GR", headers={"Accept-Encoding": "identity",
+                                                      "If-None-Match": first.headers["ETag"]})
+        uncached = await http.get("/articles/FR")
+        uncached_again = await http.get("/articles/FR", headers={"If-None-Match": uncached.headers["ETag"]})
+        return first, again, uncached, uncached_again
+
+    first, again, uncached, uncached_again = with_api(steps)
+    assert first.status_code == 200
+    assert first.headers["Content-Encoding"] == "gzip"
+    assert first.headers["ETag"].endswith('-gzip"')
+    assert first.headers["Cache-Control"].startswith("public, max-age=")
+    assert "Last-Modified" in first.headers
+    # The gzip variant's ETag revalidates the identity body too
+    assert again.status_code == 304 and again.content == b""
+    assert again.headers["ETag"] == first.headers["ETag"].replace('-gzip"', '"')
+
+    # Bodies read straight from Firebase are validated on every use
+    assert uncached.headers["Cache-Control"] == "no-cache"
+    assert uncached_again.status_code == 304
+
+
+def test_etags_change_with_content(database, app_main, with_api):
+    refresh(with_api, "GR")
+    before = with_api(lambda http: http.get("/articles/GR")).headers["ETag"]
+
+    database.data["articles"]["GR"]["gr30"] = make_article("gr30", 2000)
+    refresh(with_api, "GR")
+    response = with_api(lambda http: http.get("/articles/GR", headers={"If-None-Match": before}))
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != before
+    assert ids(response.json()["articles"])[0] == "gr30"
+
+
+def test_batch_answers_each_country_separately(database, app_main, with_api, monkeypatch):
+    refresh(with_api, "GR")
+    client = app_main.firebase_client
+    read_country = client.get_recent_articles_by_country
+
+    async def failing_for_italy(country, limit):
+        if country == "IT":
+            raise RuntimeError("Firebase unavailable")
+        return await read_country(country, limit)
+
+    monkeypatch.setattr(client, "get_recent_articles_by_country", failing_for_italy)
+    response = with_api(lambda http: http.get("/articles", params={"countries": "gr, fr,GR,it", "limit": 2}))
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    # Duplicates are dropped and codes uppercased, in request order
+    assert list(results) == ["GR", "FR", "IT"]
+    assert results["GR"]["source"] == "cache"
+    assert ids(results["GR"]["articles"]) == newest_first(database, "GR")[:2]
+    assert results["FR"]["source"] == "firebase"
+    assert ids(results["FR"]["articles"]) == ["fr1", "fr2"]
+    # One failing country doesn't fail the others
+    assert results["IT"] == {"status": "error", "message": "Firebase unavailable"}
+
+
+def test_batch_rejects_empty_and_oversized_requests(app_main, with_api):
+    too_many = ",".join(f"C{i}" for i in range(app_main.MAX_BATCH_COUNTRIES + 1))
+
+    async def steps(http):
+        return (await http.get("/articles", params={"countries": " , "}),
+                await http.get("/articles", params={"countries": too_many}))
+
+    assert [response.status_code for response in with_api(steps)] == [400, 400]
+
+
+def test_stale_countries_are_served_while_they_refresh(database, app_main, with_api):
+    refresh(with_api, "GR")
+    cache = app_main.article_cache
+    cache.last_refresh_time["GR"] -= 2 * app_main.cache_refresher.interval
+    database.data["articles"]["GR"]["gr30"] = make_article("gr30", 2000)
+
+    async def steps(http):
+        stale = await http.get("/articles/GR")
+        await asyncio.gather(*app_main.cache_refresher._tasks)
+        return stale, await http.get("/articles/GR")
+
+    stale, fresh = with_api(steps)
+    assert stale.json()["source"] == "cache"
+    assert "gr30" not in ids(stale.json()["articles"])
+    # The stale hit scheduled a background refresh, which picked up the new article
+    assert ids(fresh.json()["articles"])[0] == "gr30"
+    assert not app_main.cache_refresher.is_stale("GR")
+
+
+def test_overlapping_refreshes_share_one_read(database, app_main, with_api):
+    refresh(with_api, "GR")
+    database.data["articleVersion"] = {"GR": 2}
+    database.data["articles"]["GR"]["gr30"] = make_article("gr30", 2000)
+    database.requests.clear()
+
+    async def steps(http):
+        return await asyncio.gather(
+            app_main._refresh_country("GR"),
+            http.post("/refresh-cache", json={"countries": ["GR"]})
+        )
+
+    background, response = with_api(steps)
+    assert response.json()["results"]["GR"]["status"] == "success"
+    assert background == response.json()["results"]["GR"]["article_count"]
+    # The background refresh and /refresh-cache shared one version read and one delta read
+    assert database.requests.count("http://fake-rtdb/articleVersion/GR.json") == 1
+    assert sum("startAt" in url for url in database.requests) == 1
+    assert ids(app_main.article_cache.get_articles("GR"))[:2] == ["gr30", "gr29"]
@@ -0,0 +1,158 @@
+from app.cache import ArticleCache
+from app.cache_store import JSONCacheStore
+
+from conftest import ids, make_article
+
+
+def test_read_through_populates_cache(database, with_client, tmp_path):
+    cache = ArticleCache(JSONCacheStore(str(tmp_path / "article_cache.json")), default_depth=5)
+    cache.set_whitelisted_countries(["GR"])
+
+    assert cache.get_articles("GR", 5) is None
+    fetched = with_client(lambda client: client.get_recent_articles_by_country("GR", 5))
+    cache.store_fetched_articles("GR", fetched)
+    requests = len(database.requests)
+
+    assert ids(cache.get_articles("GR", 5)) == ids(fetched)
+    assert cache.get_prepared_body("GR", 10) is None
+    assert len(database.requests) == requests
+
+    # Countries outside the whitelist are not cached; empty ones are remembered as empty
+    cache.store_fetched_articles("FR", [{"id": "fr1", **make_article("fr1", 502)}])
+    cache.store_fetched_articles("XX", [])
+    assert cache.get_articles("FR", 1) is None
+    assert cache.is_negative_cached("XX")
+
+
+
+def test_read_through_can_be_disabled_and_negative_entries_expire(tmp_path):
+    cache = ArticleCache(JSONCacheStore(str(tmp_path / "article_cache.json")), read_through=False, negative_ttl=0)
+    cache.set_whitelisted_countries(["GR"])
+
+    cache.store_fetched_articles("GR", [{"id": "gr00", **make_article("gr00", 1000)}])
+    cache.store_fetched_articles("XX", [])
+    assert cache.get_articles("GR", 1) is None
+    assert not cache.is_negative_cached("XX")
+
+
+def test_cache_depths_load_before_prepared_bodies(with_client, tmp_path):
+    path = str(tmp_path / "article_cache.json")
+    cache = ArticleCache(JSONCacheStore(path), default_depth=10)
+    cache.set_whitelisted_countries(["GR"])
+    cache.set_cache_depths({"GR": 5})
+
+    cache.set_articles("GR", with_client(lambda client: client.get_recent_articles_by_country("GR", 5)))
+    cache.store.close()
+
+    reloaded = ArticleCache(JSONCacheStore(path), default_depth=10)
+    assert len(reloaded.get_articles("GR", 5)) == 5
+    # 5 articles can't answer a limit of 10, even though the default depth is 10
+    assert reloaded.get_prepared_body("GR", 10) is None
+    assert reloaded.get_articles("GR", 10) is None
+
+
+def test_cache_depth_changes_trim_or_drop_cached_lists(tmp_path):
+    cache = ArticleCache(JSONCacheStore(str(tmp_path / "article_cache.json")), default_depth=10)
+    cache.set_whitelisted_countries(["GR", "FR"])
+    cache.set_articles("GR", [{"id": f"gr{i}", **make_article(f"gr{i}", 1000 - i)} for i in range(10)])
+    cache.set_articles("FR", [{"id": "fr0", **make_article("fr0", 500)}])
+
+    cache.set_cache_depths({"GR": 5})
+    assert ids(cache.get_articles("GR")) == ["gr0", "gr1", "gr2", "gr3", "gr4"]
+    assert cache.get_prepared_body("GR", 10) is None
+
+    # GR may have more articles than the 5 cached, so they can't answer a depth of 25;
+    # FR's single article is everything it has
+    cache.set_cache_depths({"GR": 25, "FR": 25})
+    assert "GR" not in cache.get_cached_countries()
+    assert ids(cache.get_articles("FR", 25)) == ["fr0"]
+    assert cache.get_prepared_body("FR", 25) is not None
+
+
+def test_refresh_only_serializes_prepared_bodies(with_client, tmp_path):
+    cache = ArticleCache(JSONCacheStore(str(tmp_path / "article_cache.json")), default_depth=25)
+    cache.set_whitelisted_countries(["GR"])
+    cache.set_articles("GR", with_client(lambda client: client.get_recent_articles_by_country("GR", 25)))
+    bytes_before = cache.get_total_bytes()
+
+    assert all(list(body.variants) == ["identity"] for body in cache.bodies["GR"].values())
+    cache.get_prepared_body("GR", 10).variant("gzip")
+    # Compressed variants count towards the cache size once they exist
+    assert cache.get_total_bytes() > bytes_before
+
+
+def country_articles(country):
+    """Ten articles of a country, all of the same size"""
+    return [{"id": f"{country}{i}", **make_article(f"{country}{i}", 1000 - i)} for i in range(10)]
+
+
+def bounded_cache(tmp_path, policy, entries):
+    """A cache with room for about `entries` countries like those of country_articles"""
+    probe = ArticleCache(JSONCacheStore(str(tmp_path / "probe.json")), policy=policy)
+    probe.set_articles("AA", country_articles("AA"))
+    size = probe.get_total_bytes()
+    return ArticleCache(JSONCacheStore(str(tmp_path / "article_cache.json")), policy=policy,
+                        max_bytes=int(size * (entries + 0.5)))
+
+
+def test_lru_evicts_least_recently_used_unpinned_countries(tmp_path):
+    cache = bounded_cache(tmp_path, "lru", 3)
+    cache.set_whitelisted_countries(["PP"])
+    for country in ("PP", "AA", "BB"):
+        cache.set_articles(country, country_articles(country))
+    cache.get_articles("AA")
+    cache.get_articles("PP")
+
+    cache.set_articles("CC", country_articles("CC"))
+
+    # BB was used least recently; PP is older but pinned by the whitelist
+    assert sorted(cache.get_cached_countries()) == ["AA", "CC", "PP"]
+    assert cache.stats["evictions"]["BB"] == 1
+    assert cache.get_total_bytes() <= cache.max_bytes
+
+
+def test_tinylfu_only_admits_more_requested_countries(tmp_path):
+    cache = bounded_cache(tmp_path, "tinylfu", 2)
+    for country, requests in (("AA", 3), ("BB", 3), ("CC", 1), ("DD", 5)):
+        for _ in range(requests):
+            cache.record_request(country)
+    cache.set_articles("AA", country_articles("AA"))
+    cache.set_articles("BB", country_articles("BB"))
+
+    cache.set_articles("CC", country_articles("CC"))
+    assert sorted(cache.get_cached_countries()) == ["AA", "BB"]
+    assert cache.stats["rejections"]["CC"] == 1
+
+    cache.set_articles("DD", country_articles("DD"))
+    assert sorted(cache.get_cached_countries()) == ["BB", "DD"]
+    assert cache.stats["evictions"]["AA"] == 1
+
+
+def test_auto_whitelist_follows_popularity(tmp_path):
+    path = str(tmp_path / "article_cache.json")
+    cache = ArticleCache(JSONCacheStore(path), auto_whitelist_size=1, auto_whitelist_min_requests=3,
+                         auto_whitelist_interval=0)
+    cache.set_whitelisted_countries(["PP"])
+
+    def request(country, times):
+        for _ in range(times):
+            cache.record_request(country)
+
+    request("PP", 10)
+    request("GR", 2)
+    assert not cache.is_country_whitelisted("GR")
+    request("GR", 1)
+    # The pinned country doesn't take the single automatic slot
+    assert cache.auto_whitelisted_countries == {"GR"}
+    cache.set_articles("GR", country_articles("GR"))
+
+    # A tie keeps the current holder; only a more requested country displaces it
+    request("FR", 3)
+    assert cache.auto_whitelisted_countries == {"GR"}
+    request("FR", 1)
+    assert cache.auto_whitelisted_countries == {"FR"}
+    assert cache.get_articles("GR") is None
+    assert sorted(cache.get_whitelisted_countries()) == ["FR", "PP"]
+
+    reloaded = ArticleCache(JSONCacheStore(path), auto_whitelist_size=1)
+    assert reloaded.auto_whitelisted_countries == {"FR"}
@@ -0,0 +1,69 @@
+from app.cache import ArticleCache
+from app.cache_store import JSONCacheStore, SQLiteCacheStore, empty_cache_data
+
+from conftest import ids, make_article
+
+
+def articles(*titles):
+    """Cached article entries, newest first"""
+    return [{"id": title, **make_article(title, 1000 - i)} for i, title in enumerate(titles)]
+
+
+def test_sqlite_store_round_trips_cache(tmp_path):
+    path = str(tmp_path / "article_cache.db")
+    cache = ArticleCache(SQLiteCacheStore(path))
+    cache.set_whitelisted_countries(["GR", "FR"])
+    cache.set_cache_depths({"GR": 25})
+    cache.set_articles("GR", articles("gr1", "gr0"), version=3)
+    cache.set_articles("FR", articles("fr0"))
+    cache.store.close()
+
+    reloaded = ArticleCache(SQLiteCacheStore(path))
+    assert ids(reloaded.get_articles("GR")) == ["gr1", "gr0"]
+    assert ids(reloaded.get_articles("FR")) == ["fr0"]
+    assert reloaded.get_article_version("GR") == 3
+    assert reloaded.get_article_version("FR") is None
+    assert reloaded.get_last_refresh_time("GR") == cache.get_last_refresh_time("GR")
+    assert sorted(reloaded.get_whitelisted_countries()) == ["FR", "GR"]
+    assert reloaded.get_cache_depth("GR") == 25
+
+
+def test_sqlite_store_writes_only_changed_rows(tmp_path):
+    store = SQLiteCacheStore(str(tmp_path / "article_cache.db"))
+    cache = ArticleCache(store)
+    cache.set_whitelisted_countries(["GR", "FR"])
+    cache.set_articles("GR", articles("gr0"))
+    cache.set_articles("FR", articles("fr0"))
+
+    statements = []
+    store.conn.set_trace_callback(statements.append)
+    cache.set_articles("FR", articles("fr1", "fr0"))
+    cache.set_whitelisted_countries(["GR"])
+
+    writes = [statement for statement in statements if statement.startswith(("INSERT", "DELETE"))]
+    # FR's row is replaced, then deleted by the whitelist change; GR's row is never rewritten
+    country_writes = [write for write in writes if " countries " in write]
+    assert len(country_writes) == 2 and all("'FR'" in write for write in country_writes)
+    assert country_writes[1].startswith("DELETE")
+    assert all("'GR'" not in write for write in writes if "settings" not in write)
+    assert [row[0] for row in store.conn.execute("SELECT country FROM countries")] == ["GR"]
+
+
+def test_sqlite_store_imports_legacy_json_once(tmp_path):
+    json_path = str(tmp_path / "article_cache.json")
+    db_path = str(tmp_path / "article_cache.db")
+    legacy = empty_cache_data()
+    legacy["articles"]["GR"] = articles("gr0")
+    legacy["last_refresh_time"]["GR"] = 1234.5
+    legacy["whitelisted_countries"] = ["GR"]
+    JSONCacheStore(json_path).save(legacy, ["GR"], settings=True)
+
+    store = SQLiteCacheStore(db_path, legacy_json_path=json_path)
+    assert store.load() == legacy
+    store.close()
+
+    # Once the database holds data, later changes to the JSON file are ignored
+    legacy["articles"]["FR"] = articles("fr0")
+    JSONCacheStore(json_path).save(legacy, ["FR"], settings=False)
+    store = SQLiteCacheStore(db_path, legacy_json_path=json_path)
+    assert "FR" not in store.load()["articles"]
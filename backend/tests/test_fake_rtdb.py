@@ -0,0 +1,105 @@
+from app.firebase_client import article_sort_key
+
+from conftest import ids, make_article, newest_first
+
+
+def test_ordered_query_returns_newest_articles(database, with_client):
+    async def steps(client):
+        return (await client.query_articles_by_published("GR", 5),
+                await client.query_articles_by_published("GR", 3))
+
+    articles, fewer = with_client(steps)
+    assert ids(articles) == newest_first(database, "GR")[:5]
+    assert ids(fewer) == newest_first(database, "GR")[:3]
+    # The layout check runs once per country, then each query is a single read
+    assert len(database.requests) == 3
+    assert "endAt=null" in database.requests[0]
+    assert "limitToLast=5" in database.requests[1]
+
+
+def test_ordered_query_unsupported_for_date_buckets(database, with_client):
+    async def steps(client):
+        first = await client.query_articles_by_published("FR", 5)
+        second = await client.query_articles_by_published("FR", 5)
+        recent = await client.get_recent_articles_by_country("FR", 2)
+        return first, second, recent
+
+    first, second, recent = with_client(steps)
+    assert first is None and second is None
+    # The second query is answered from query_unsupported without a read
+    assert sum("orderBy" in url for url in database.requests) == 1
+    assert ids(recent) == ["fr1", "fr2"]
+
+
+def test_mixed_layout_reads_whole_country(database, with_client, caplog):
+    greece = database.data["articles"]["GR"]
+    greece["2023-12-31"] = {"old0": make_article("old0", 900), "new0": make_article("new0", 2000)}
+
+    async def steps(client):
+        return (await client.query_articles_by_published("GR", 5),
+                await client.get_indexed_recent_articles("GR", 5),
+                await client.get_recent_articles_by_country("GR", 5))
+
+    queried, indexed, recent = with_client(steps)
+    assert queried is None and indexed is None
+    # The bucketed article newer than every flat one isn't lost
+    assert ids(recent)[0] == "new0"
+    assert "date buckets" in caplog.text
+
+
+def test_ordered_query_requires_index(database, with_client):
+    database.rules = {}
+
+    assert with_client(lambda client: client.query_articles_by_published("GR", 5)) is None
+
+
+def test_index_answers_shallow_requests(database, with_client):
+    articles = with_client(lambda client: client.get_recent_articles_by_country("GR", 3))
+
+    assert ids(articles) == newest_first(database, "GR")[:3]
+    # The layout check, one index read and one read per indexed article, never the whole country
+    assert len(database.requests) == 5
+    assert sum("orderBy" in url for url in database.requests) == 1
+
+
+def test_index_too_shallow_falls_back_to_query(database, with_client):
+    async def steps(client):
+        return (await client.get_indexed_recent_articles("GR", 10),
+                await client.get_recent_articles_by_country("GR", 10))
+
+    indexed, recent = with_client(steps)
+    assert ids(indexed) == newest_first(database, "GR")[:10]
+
+    database.data["articleIndex"]["GR"]["latestArticles"] = ["gr29", "gr28"] * 10
+    database.data["articles"]["GR"].pop("gr28")
+    indexed, recent = with_client(steps)
+    assert indexed is None
+    assert ids(recent) == newest_first(database, "GR")[:10]
+
+
+def test_cursor_pages_cover_country_once(database, with_client):
+    async def all_pages(client):
+        pages = []
+        before = None
+        while True:
+            page, has_more = await client.get_articles_page("GR", 4, before)
+            pages.append(page)
+            if not has_more:
+                return pages
+            before = article_sort_key(page[-1])
+
+    pages = with_client(all_pages)
+    assert [article_id for page in pages for article_id in ids(page)] == newest_first(database, "GR")
+    assert all(len(page) == 4 for page in pages[:-1])
+    assert all("orderBy" in url for url in database.requests)
+
+
+def test_cursor_pages_without_queries_use_full_download(with_client):
+    async def steps(client):
+        first, has_more = await client.get_articles_page("FR", 2)
+        rest, more = await client.get_articles_page("FR", 2, article_sort_key(first[-1]))
+        return first, has_more, rest, more
+
+    first, has_more, rest, more = with_client(steps, use_queries=False)
+    assert ids(first) == ["fr1", "fr2"] and has_more
+    assert ids(rest) == ["fr0"] and not more
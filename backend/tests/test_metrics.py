@@ -0,0 +1,62 @@
+from app.cache import ArticleCache
+from app.cache_store import JSONCacheStore
+from app.metrics import MetricsRegistry, register_cache
+
+from conftest import make_article
+
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    reads = registry.counter("reads_total", "Reads", ("method",))
+    latency = registry.histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+    reads.inc(("get",))
+    reads.inc(("get",), 2)
+    reads.inc(('say "hi"',))
+    latency.observe(0.05, ("/a",))
+    latency.observe(0.5, ("/a",))
+    latency.observe(5, ("/a",))
+
+    lines = registry.render().splitlines()
+    assert "# TYPE reads_total counter" in lines
+    assert 'reads_total{method="get"} 3' in lines
+    assert 'reads_total{method="say \\"hi\\""} 1' in lines
+    # Buckets are cumulative and end with +Inf, followed by the sum and count
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'latency_seconds_sum{route="/a"} 5.55' in lines
+    assert 'latency_seconds_count{route="/a"} 3' in lines
+
+
+def test_cache_metrics_fold_unknown_countries(tmp_path):
+    cache = ArticleCache(JSONCacheStore(str(tmp_path / "article_cache.json")))
+    cache.set_whitelisted_countries(["GR"])
+    cache.set_articles("GR", [{"id": "gr0", **make_article("gr0", 1000)}])
+    registry = MetricsRegistry()
+    register_cache(cache, registry)
+
+    cache.get_articles("GR")
+    for country in ("XX", "YY", "YY"):
+        cache.get_articles(country)
+
+    lines = registry.render().splitlines()
+    assert 'article_cache_hits_total{country="GR"} 1' in lines
+    # Countries outside the whitelist and cache share one label
+    assert 'article_cache_misses_total{country="other"} 3' in lines
+    assert not any('country="XX"' in line or 'country="YY"' in line for line in lines)
+    assert "article_cache_countries 1" in lines
+    assert f"article_cache_bytes {cache.get_total_bytes()}" in lines
+
+
+def test_metrics_endpoint_reports_requests_and_reads(app_main, with_api):
+    async def steps(http):
+        await http.get("/articles/GR")
+        return await http.get("/metrics")
+
+    response = with_api(steps)
+
+    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    # Latency is labelled by route template, never by the raw path
+    assert 'http_request_duration_seconds_count{route="/articles/{country}",method="GET",status="200"}' in response.text
+    assert "/articles/GR" not in response.text
+    assert 'firebase_requests_total{method="get_recent_articles_by_country",status="200"}' in response.text
@@ -0,0 +1,64 @@
+import pytest
+
+from app.read_budget import ReadBudget, ReadBudgetExceeded
+
+
+def test_budget_degrades_then_refuses():
+    budget = ReadBudget(max_calls=10, degrade_at=0.5)
+    for _ in range(5):
+        budget.record(100)
+
+    assert budget.is_tight() and not budget.is_exhausted()
+    budget.check()
+    with pytest.raises(ReadBudgetExceeded):
+        budget.check(expensive=True)
+
+    for _ in range(5):
+        budget.record(100)
+    with pytest.raises(ReadBudgetExceeded) as excinfo:
+        budget.check()
+    assert 1 <= excinfo.value.retry_after <= budget.window
+    assert budget.usage()["refused"] == 2
+
+
+def test_client_quota_only_refuses_that_client():
+    budget = ReadBudget(client_rate=10, client_burst=100)
+    budget.record(150, client="10.0.0.1")
+
+    with pytest.raises(ReadBudgetExceeded) as excinfo:
+        budget.check("10.0.0.1")
+    # 50 bytes overdrawn at 10 bytes per second
+    assert excinfo.value.retry_after == 5
+    budget.check("10.0.0.2")
+    budget.check(None)
+
+
+def test_refused_reads_raise_read_budget_exceeded(with_client):
+    async def steps(client):
+        await client.get_article_counts("GR")
+        await client.get_articles_page("GR", 4)
+
+    with pytest.raises(ReadBudgetExceeded) as excinfo:
+        with_client(steps, budget=ReadBudget(max_calls=1))
+    assert excinfo.value.retry_after >= 1
+
+
+def test_spent_budget_answers_429_and_serves_cache(app_main, with_api):
+    with_api(lambda http: http.post("/refresh-cache", json={"countries": ["GR"]}))
+    budget = app_main.read_budget
+    budget.max_calls = budget.window_calls
+
+    async def steps(http):
+        return (await http.get("/articles/GR"),
+                await http.get("/articles/GR", params={"limit": 30}),
+                await http.get("/articles/FR"),
+                await http.get("/export"))
+
+    cached, degraded, uncached, export = with_api(steps)
+    assert cached.status_code == 200 and cached.json()["source"] == "cache"
+    # Deeper reads are cut down to the cached articles instead of failing
+    assert degraded.json()["source"] == "degraded"
+    assert degraded.json()["count"] == app_main.article_cache.get_cache_depth("GR")
+    for refused in (uncached, export):
+        assert refused.status_code == 429
+        assert int(refused.headers["Retry-After"]) >= 1
@@ -0,0 +1,75 @@
+import asyncio
+import time
+
+from app.cache import ArticleCache
+from app.cache_store import JSONCacheStore
+from app.refresher import CacheRefresher
+
+from conftest import make_article
+
+COUNTRIES = ["C0", "C1", "C2", "C3", "C4", "C5", "C6", "C7"]
+
+
+def make_cache(tmp_path, refreshed_ago=None) -> ArticleCache:
+    """A cache with COUNTRIES whitelisted, cached `refreshed_ago` seconds ago (or never cached)"""
+    cache = ArticleCache(JSONCacheStore(str(tmp_path / "article_cache.json")))
+    cache.set_whitelisted_countries(COUNTRIES)
+    if refreshed_ago is not None:
+        for country in COUNTRIES:
+            cache.set_articles(country, [{"id": "a", **make_article("a", 1000)}])
+            cache.last_refresh_time[country] = time.time() - refreshed_ago
+    return cache
+
+
+async def no_refresh(country):
+    return None
+
+
+def test_fresh_countries_come_due_within_jitter(tmp_path):
+    cache = make_cache(tmp_path, refreshed_ago=0)
+    refresher = CacheRefresher(cache, no_refresh, interval=100, jitter=0.2)
+
+    for country in COUNTRIES:
+        due = refresher._due_time(country) - cache.get_last_refresh_time(country)
+        assert 80 <= due <= 100
+
+
+def test_overdue_countries_are_spread_out(tmp_path):
+    for cache in (make_cache(tmp_path / "never"), make_cache(tmp_path / "stale", refreshed_ago=1000)):
+        refresher = CacheRefresher(cache, no_refresh, interval=100, startup_spread=30)
+        now = time.time()
+        due = [refresher._due_time(country) - now for country in COUNTRIES]
+
+        assert all(-1 <= seconds <= 30 for seconds in due)
+        # Random points in the spread, not one shared refresh time
+        assert len({round(seconds, 3) for seconds in due}) > 1
+
+
+def test_background_refreshes_are_bounded(tmp_path):
+    cache = make_cache(tmp_path, refreshed_ago=1000)
+    running = 0
+    peak = 0
+    refreshed = []
+
+    async def refresh(country):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        refreshed.append(country)
+        cache.mark_refreshed(country)
+        return None
+
+    async def steps():
+        refresher = CacheRefresher(cache, refresh, interval=100, concurrency=2)
+        for country in COUNTRIES:
+            refresher.revalidate_if_stale(country)
+        await asyncio.gather(*refresher._tasks)
+        return refresher
+
+    refresher = asyncio.run(steps())
+    assert sorted(refreshed) == COUNTRIES
+    assert peak == 2
+    # Each refreshed country is next due about an interval later
+    assert all(refresher.next_refresh[country] > time.time() + 50 for country in COUNTRIES)
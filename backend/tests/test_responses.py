@@ -0,0 +1,29 @@
+import gzip
+import json
+
+from app.responses import PreparedBody, prepared_response
+
+
+def test_prepared_body_compresses_each_encoding_once():
+    prepared = PreparedBody({"articles": ["a" * 1000]})
+    assert list(prepared.variants) == ["identity"]
+    identity_size = prepared.size()
+
+    compressed = prepared.variant("gzip")
+    assert json.loads(gzip.decompress(compressed)) == {"articles": ["a" * 1000]}
+    assert prepared.variant("gzip") is compressed
+    assert prepared.size() == identity_size + len(compressed)
+
+
+def test_prepared_response_picks_accepted_encoding():
+    prepared = PreparedBody({"count": 0})
+
+    plain = prepared_response(prepared, None)
+    assert plain.body == b'{"count":0}'
+    assert "Content-Encoding" not in plain.headers
+    assert list(prepared.variants) == ["identity"]
+
+    compressed = prepared_response(prepared, "gzip;q=1, identity;q=0.5")
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert compressed.headers["ETag"] == prepared.etag("gzip")
+    assert gzip.decompress(compressed.body) == plain.body
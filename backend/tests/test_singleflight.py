@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from app.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_result():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return ["article"]
+
+    async def steps():
+        group = SingleFlight()
+        results = await asyncio.gather(*(group.do(("GR", 10), fetch) for _ in range(5)))
+        other = await group.do(("GR", 25), fetch)
+        return group, results, other
+
+    group, results, other = asyncio.run(steps())
+    assert results == [["article"]] * 5
+    # One call for the five concurrent callers, one for the other key
+    assert len(calls) == 2
+    assert group.in_flight() == 0
+
+
+def test_calls_after_completion_run_again():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return len(calls)
+
+    async def steps():
+        group = SingleFlight()
+        return await group.do("GR", fetch), await group.do("GR", fetch)
+
+    assert asyncio.run(steps()) == (1, 2)
+
+
+def test_exceptions_reach_every_caller():
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("Firebase unavailable")
+
+    async def steps():
+        group = SingleFlight()
+        return group, await asyncio.gather(group.do("GR", fetch), group.do("GR", fetch), return_exceptions=True)
+
+    group, results = asyncio.run(steps())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert group.in_flight() == 0
+
+
+def test_cancelled_caller_does_not_cancel_shared_call():
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def steps():
+        group = SingleFlight()
+        first = asyncio.ensure_future(group.do("GR", fetch))
+        second = asyncio.ensure_future(group.do("GR", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(steps()) == "done"
@@ -244,6 +244,22 @@ def update_article_index(country, new_article_ids=None):
         logger.error(f"Error updating article index for {country}: {e}")
 
 
+def bump_article_version(country):
+    """Stamp articleVersion/{country} with the server time so readers know it changed
+    
+    The backend compares this small node against the version its cache was loaded
+    at and skips refetching countries whose stamp hasn't moved.
+    
+    Args:
+        country: The country whose articles were just written
+    """
+    try:
+        db.child("articleVersion").child(country).set({".sv": "timestamp"})
+        logger.info(f"Bumped article version for {country}")
+    except Exception as e:
+        logger.error(f"Error bumping article version for {country}: {e}")
+
+
 def process_standard_data(data, source, force_update=False):
     """Process scraper data and add to Firebase
     
@@ -315,6 +331,9 @@ def process_standard_data(data, source, force_update=False):
         # Update the article index with the new articles
         update_article_index(country, new_articles)
         
+        # Bump the version last, once the articles and index are in place
+        bump_article_version(country)
+        
         logger.info(f"Added {len(new_articles)} new articles for {country} from {source}")
     else:
         logger.info(f"No new articles to add for {country} from {source}")
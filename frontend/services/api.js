@@ -8,14 +8,15 @@ const API_BASE_URL = 'http://localhost:8000';
  * Fetch articles for a specific country
  * @param {string} country - Country code (e.g., 'USA')
  * @param {number} limit - Maximum number of articles to return (default: 10)
+ * @param {string} view - 'summary' for the story card fields only, 'full' for complete articles (default: 'summary')
  * @returns {Promise<Object>} - Promise that resolves to the articles response
  */
-export async function fetchArticlesByCountry(country, limit = 10) {
+export async function fetchArticlesByCountry(country, limit = 10, view = 'summary') {
   try {
     console.log(`Fetching articles for ${country} with limit ${limit}`);
-    console.log(`Request URL: ${API_BASE_URL}/articles/${country}?limit=${limit}`);
+    console.log(`Request URL: ${API_BASE_URL}/articles/${country}?limit=${limit}&view=${view}`);
     
-    const response = await fetch(`${API_BASE_URL}/articles/${country}?limit=${limit}`, {
+    const response = await fetch(`${API_BASE_URL}/articles/${country}?limit=${limit}&view=${view}`, {
       method: 'GET',
       headers: {
         'Accept': 'application/json',
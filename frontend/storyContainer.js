@@ -42,7 +42,9 @@ function createNarrative(article) {
     if (article.content && article.content.articleText) {
         // Get the first 250 characters of the article text
         const fullText = article.content.articleText;
-        description = fullText.substring(0, 250) + (fullText.length > 250 ? '...' : '');
+        // Summary responses are already cut to 250 characters and flag the truncation
+        const truncated = fullText.length > 250 || article.content.articleTextTruncated;
+        description = fullText.substring(0, 250) + (truncated ? '...' : '');
     }
     
     let newNarrative = document.createElement('div');